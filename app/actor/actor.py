@@ -1,24 +1,103 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Any, Optional
+from collections import deque
+from contextvars import Context, copy_context
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Deque, Generic, Set, TypeVar, Any, Optional
 import asyncio
+import copy
+import time
 import uuid
 
+from app.core import settings
+from app.services.actor_memory_store import ActorMemoryStore
+from app.services.metrics import histogram
+from app.services.tracing import span
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+actor_message_seconds = histogram("actor_message_seconds", "Seconds actors spend handling a message, by actor class")
 
 T = TypeVar("T")
 
 
+class Backpressure(Enum):
+    """What to do with a new message when the mailbox is full."""
+    BLOCK = "block"  # wait for space
+    DROP_OLDEST = "drop_oldest"  # fail the oldest queued message with MailboxFull
+    REJECT = "reject"  # raise MailboxFull to the sender
+
+
+class Supervision(Enum):
+    """What to do with the actor when handling a message raises."""
+    RESUME = "resume"  # keep the memory and carry on
+    RESTART = "restart"  # reset the memory to its initial state and carry on
+    STOP = "stop"  # stop the actor and fail queued messages
+
+
+class MailboxFull(Exception):
+    pass
+
+
+class ActorStopped(Exception):
+    pass
+
+
+@dataclass
+class Envelope:
+    message: Any
+    future: asyncio.Future
+    # The sender's context, so the message is handled inside the sender's trace
+    context: Context = field(default_factory=copy_context)
+
+
 class Actor(Generic[T], ABC):
-    def __init__(self, initial_memory: Optional[T], actor_id: Optional[str] = None):
+    def __init__(
+        self,
+        initial_memory: Optional[T],
+        actor_id: Optional[str] = None,
+        mailbox_size: int = settings.ACTOR_MAILBOX_SIZE,
+        backpressure: Backpressure = Backpressure(settings.ACTOR_BACKPRESSURE),
+        supervision: Supervision = Supervision(settings.ACTOR_SUPERVISION),
+        max_restarts: int = settings.ACTOR_MAX_RESTARTS,
+        restart_window: float = settings.ACTOR_RESTART_WINDOW,
+        memory_store: Optional[ActorMemoryStore] = None,
+    ):
         """
         Initialize actor with either new or persisted memory.
         If no actor_id is provided, generates a new UUID.
 
+        Messages are processed one at a time, in order, from a bounded mailbox.
+
         Args:
             initial_memory: Default memory if no persisted state exists
             actor_id: Optional identifier to retrieve persisted memory
+            mailbox_size: Maximum number of queued messages
+            backpressure: Policy when the mailbox is full
+            supervision: Policy when handling a message raises
+            max_restarts: Restarts allowed within restart_window before the actor is stopped
+            restart_window: Seconds over which restarts are counted
+            memory_store: Store to load memory from on the first message and persist it to after each one
         """
         self._id: str = actor_id or str(uuid.uuid4())
         self._memory: T = initial_memory or T()
+        self._initial_memory: T = copy.deepcopy(self._memory)
+        self.mailbox_size = mailbox_size
+        self.backpressure = backpressure
+        self.supervision = supervision
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._mailbox: Deque[Envelope] = deque()
+        self._has_messages = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._current: Optional[Envelope] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._tells: Set[asyncio.Future] = set()
+        self._restarts: Deque[float] = deque()
+        self._stopped = False
+        self.memory_store = memory_store
+        self._memory_loaded = memory_store is None
 
     @property
     def id(self) -> str:
@@ -34,17 +113,16 @@ class Actor(Generic[T], ABC):
     def memory(self) -> T:
         return self._memory
 
-    def _load_memory(self, actor_id: str) -> T:
+    async def _load_memory(self, actor_id: str) -> Optional[T]:
         """
-        Load persisted memory for this actor.
-        Must be implemented by concrete actors.
+        Load persisted memory for this actor from its memory store.
 
         Args:
             actor_id: The identifier for the persisted memory
         Returns:
-            T: The loaded memory object
+            T: The loaded memory object, or None if nothing was persisted
         """
-        pass
+        return await self.memory_store.get(actor_id, type(self._initial_memory))
 
     @abstractmethod
     async def _on_receive(self, message: Any):
@@ -62,22 +140,192 @@ class Actor(Generic[T], ABC):
     async def ask(self, message: Any):
         """
         Blocking call to get a result from the actor.
+        Cancelling the caller cancels the message, whether queued or being processed.
 
         Args:
             message: The message to be processed
         Returns:
             Any: The result from on_receive
+        Raises:
+            MailboxFull: If the mailbox is full and the policy is REJECT, or the message was dropped
+            ActorStopped: If the actor is stopped
         """
-        return await self._on_receive(message)
+        envelope = self._envelope(message)
+        if self.backpressure == Backpressure.BLOCK:
+            await self._wait_for_space()
+        self._enqueue(envelope)
+        return await envelope.future
 
-    def tell(self, message: Any):
+    def tell(self, message: Any) -> asyncio.Future:
         """
         Non-blocking call to send a message to the actor.
 
+        The returned future resolves with the result of on_receive; it can be
+        awaited or cancelled. Failures of tells nobody awaits are logged.
+
         Args:
             message: The message to be processed
+        Returns:
+            asyncio.Future: The pending result
+        Raises:
+            MailboxFull: If the mailbox is full and the policy is REJECT
+            ActorStopped: If the actor is stopped
+        """
+        envelope = self._envelope(message)
+        if self.backpressure == Backpressure.BLOCK and self._is_full():
+            # Can't block a synchronous caller: wait for space in the background
+            enqueue = asyncio.create_task(self._enqueue_when_space(envelope))
+            envelope.future.add_done_callback(lambda _: enqueue.cancel())
+        else:
+            self._enqueue(envelope)
+        self._tells.add(envelope.future)
+        envelope.future.add_done_callback(self._on_tell_done)
+        return envelope.future
+
+    async def join(self):
+        """Wait for all pending tells to finish."""
+        if self._tells:
+            await asyncio.gather(*self._tells, return_exceptions=True)
+
+    def stop(self):
+        """Stop processing; queued and pending messages fail with ActorStopped."""
+        self._stopped = True
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+        pending = list(self._mailbox) + ([self._current] if self._current else [])
+        self._mailbox.clear()
+        self._current = None
+        for envelope in pending:
+            if not envelope.future.done():
+                envelope.future.set_exception(ActorStopped(self._id))
+        # Wake senders waiting for space so they see the actor is stopped
+        self._has_space.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def _envelope(self, message: Any) -> Envelope:
+        if self._stopped:
+            raise ActorStopped(self._id)
+        return Envelope(message=message, future=asyncio.get_running_loop().create_future())
+
+    def _is_full(self) -> bool:
+        return len(self._mailbox) >= self.mailbox_size
+
+    def _enqueue(self, envelope: Envelope):
+        if self._stopped:
+            raise ActorStopped(self._id)
+        if self._is_full():
+            if self.backpressure == Backpressure.DROP_OLDEST:
+                dropped = self._mailbox.popleft()
+                if not dropped.future.done():
+                    dropped.future.set_exception(MailboxFull(f"{self._id}: message dropped"))
+                logger.warning("Mailbox full, dropped oldest message", actor_id=self._id)
+            elif self.backpressure == Backpressure.REJECT:
+                raise MailboxFull(self._id)
+        self._mailbox.append(envelope)
+        self._has_messages.set()
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _wait_for_space(self):
+        while self._is_full() and not self._stopped:
+            self._has_space.clear()
+            await self._has_space.wait()
+
+    async def _enqueue_when_space(self, envelope: Envelope):
+        try:
+            await self._wait_for_space()
+            self._enqueue(envelope)
+        except Exception as e:
+            if not envelope.future.done():
+                envelope.future.set_exception(e)
+
+    def _on_tell_done(self, future: asyncio.Future):
+        self._tells.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Tell failed", actor_id=self._id, error=repr(future.exception()))
+
+    async def _run(self):
+        """Process the mailbox one message at a time."""
+        while not self._stopped:
+            while not self._mailbox:
+                self._has_messages.clear()
+                await self._has_messages.wait()
+            envelope = self._mailbox.popleft()
+            self._has_space.set()
+            if envelope.future.done():
+                # Cancelled or dropped while queued
+                continue
+            if not self._memory_loaded:
+                await self._restore_memory()
+            self._current = envelope
+            try:
+                await self._process(envelope)
+            finally:
+                self._current = None
+
+    async def _restore_memory(self):
+        try:
+            memory = await self._load_memory(self._id)
+        except Exception as e:
+            logger.error("Failed to load actor memory", actor_id=self._id, error=str(e))
+            memory = None
+        if memory is not None:
+            self._memory = memory
+        self._memory_loaded = True
+
+    async def _process(self, envelope: Envelope):
+        task = envelope.context.run(asyncio.create_task, self._receive(envelope.message))
+        envelope.future.add_done_callback(lambda future: future.cancelled() and task.cancel())
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if task.cancelled():
+            if not envelope.future.done():
+                envelope.future.cancel()
+        elif task.exception() is not None:
+            if not envelope.future.done():
+                envelope.future.set_exception(task.exception())
+            self._supervise(task.exception())
+        elif not envelope.future.done():
+            envelope.future.set_result(task.result())
+        if self.memory_store and not self._stopped:
+            self.persist_memory(self.memory_store)
+
+    async def _receive(self, message: Any):
+        actor = type(self).__name__
+        with span("actor", actor=actor, actor_id=self._id), actor_message_seconds.time(actor=actor):
+            return await self._on_receive(message)
+
+    def _supervise(self, error: BaseException):
+        logger.error("Actor failed to handle message", actor_id=self._id, error=repr(error),
+                     supervision=self.supervision.value)
+        if self.supervision == Supervision.RESTART:
+            now = time.monotonic()
+            while self._restarts and now - self._restarts[0] > self.restart_window:
+                self._restarts.popleft()
+            if len(self._restarts) >= self.max_restarts:
+                logger.error("Actor exceeded restart limit, stopping", actor_id=self._id,
+                             max_restarts=self.max_restarts, restart_window=self.restart_window)
+                self.stop()
+                return
+            self._restarts.append(now)
+            self.restart()
+        elif self.supervision == Supervision.STOP:
+            self.stop()
+
+    def restart(self):
         """
-        asyncio.create_task(self._on_receive(message))
+        Reset the actor's memory to its initial state.
+        Actors holding other state should extend this.
+        """
+        self._memory = copy.deepcopy(self._initial_memory)
+        logger.info("Actor restarted", actor_id=self._id)
 
     def get_memory(self) -> T:
         """
@@ -97,12 +345,12 @@ class Actor(Generic[T], ABC):
         """
         self._memory = memory
 
-    def persist_memory(self, external_storage: Any):
+    def persist_memory(self, external_storage: ActorMemoryStore):
         """
         Store the actor's memory externally.
-        Must be implemented by persistant actors.
+        The store batches writes, so this is cheap to call after every message.
 
         Args:
             external_storage: The storage mechanism to persist memory
         """
-        pass
+        external_storage.mark_dirty(self._id, self._memory)
@@ -0,0 +1,58 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Generic, List, Type, TypeVar
+
+from app.actor.actor import Actor, Supervision
+from app.core import settings
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+A = TypeVar("A", bound=Actor)
+
+
+class ActorPool(Generic[A]):
+    """
+    Reusable actor shells shared across sessions.
+
+    A shell only holds clients (LLM wrappers, services); the per-session memory
+    is bound on `lease` and unbound on release, so the owning session keeps its
+    state while the shell goes back to the pool. At most `max_idle` shells are
+    kept; concurrent leases beyond that create extra shells on demand.
+    """
+
+    def __init__(self, factory: Callable[[], A], max_idle: int = settings.ACTOR_POOL_MAX_IDLE):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle: List[A] = []
+        self.created = 0
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    @asynccontextmanager
+    async def lease(self, memory) -> AsyncIterator[A]:
+        if self._idle:
+            actor = self._idle.pop()
+        else:
+            actor = self.factory()
+            self.created += 1
+        actor.set_memory(memory)
+        try:
+            yield actor
+        finally:
+            actor.set_memory(None)
+            if not actor.stopped and len(self._idle) < self.max_idle:
+                self._idle.append(actor)
+
+
+_actor_pools: Dict[Type[Actor], ActorPool] = {}
+
+
+def get_actor_pool(actor_cls: Type[A], memory_cls: type) -> ActorPool[A]:
+    """Process-wide pool of `actor_cls` shells, supervised like the sub-actors a session owns."""
+    pool = _actor_pools.get(actor_cls)
+    if pool is None:
+        pool = ActorPool(lambda: actor_cls(initial_memory=memory_cls(), supervision=Supervision.RESTART))
+        _actor_pools[actor_cls] = pool
+        logger.info("Created actor pool", actor=actor_cls.__name__)
+    return pool
@@ -1,8 +1,13 @@
+import asyncio
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Optional
+import re
+import time
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel
-from app.actor.actor import Actor
+from app.actor.actor import Actor, Supervision
+from app.actor.actor_pool import get_actor_pool
 from app.actor.health_actor import HealthActor
 from app.actor.message_actor import MessageActor
 from app.actor.order_actor import OrderActor
@@ -13,100 +18,67 @@ from app.dto.entertainment import EntertainmentMemory
 from app.dto.health import HealthMemory
 from app.dto.message import MessageMemory
 from app.dto.scheduler import SchedulerMemory
-from app.dto.session import QueryDTO, ResponseDTO
+from app.dto.session import QueryDTO, ResponseDTO, SessionDTO
+from app.core import settings
 from app.services.chat_service import ChatService
+from app.services.intent_classifier import PlannerDecisionLog, get_intent_classifier
 from app.services.llm_factory import LLMFactory, LLMProvider
-from langchain.schema import HumanMessage, SystemMessage
+from app.services.metrics import counter, histogram
+from app.services.prompt_service import get_prompt_service
+from app.services.speculation import Speculation
+from app.services.tracing import span
 import structlog
 
 logger = structlog.get_logger(__name__)
+
+planner_decisions = counter("planner_decisions_total", "Routing decisions by source (rule, model or llm)")
+planner_preroutes = counter(
+    "planner_preroutes_total", "Planner runs on interim transcripts by outcome (hit, miss, pending, stale)"
+)
+route_seconds = histogram(
+    "assistant_route_seconds",
+    "Seconds from a query reaching the assistant to its reply (or the start of a streamed reply), by planner route",
+)
+
 class PlannerState(BaseModel):
     type: str
 
-planner_prompt = """
-You are a planner for Vaani, an empathetic voice assistant for the elderly. Your job is to route queries to the correct handler.
-IMPORTANT: When a user mentions "tom" or "tomorrow" in relation to reminders or tasks, classify it as "Scheduler" type.
-
-Types:
-Scheduler - ANY requests about reminders, schedules, or future tasks. Examples:
-  - "remind me tom"
-  - "remind me tomorrow"
-  - "remind me later"
-  - "set reminder"
-Entertainment - Movie/TV requests and controls. Examples:
-  - "play a movie"
-  - "play a show"
-  - "play a song"
-  - "i want to watch a movie"
-News - News and traffic updates
-Order - Ordering food
-Health - Excercise,Medicine and health monitoring
-Communication - Messages and calls
-    - "call my son"
-    - "send a message"
-GenericQuery - General conversation
-FollowUp - Continue previous thread
-
-The Query: {query}
-The Chat History: {chat_history}
-
-REMEMBER: If the query contains "tom", "tomorrow", or "remind", it's likely a Scheduler request.
-"""
-
-assistant_prompt_senior ="""
-            You are Vaani, an empathetic voice assistant for the elderly. You help with daily tasks while being proactive and caring.
-            Keep responses concise and clear. Ask one question at a time. Be understanding of typos and common speech patterns.
-
-            User Profile:
-            Name: Ramesh
-            Age: 72
-            Location: Chennai
-            Health Conditions: Diabetes, High Blood Pressure
-            Family Contacts: Rahul (son), Rohit (nephew)
-
-            Current Context:
-            Last Health Update: Blood test due .
-            Pending Tasks: Call Rahul back
-            Medicine Schedule: 2 PM - Heart and BP medicines, 7 PM - Diabetes medicine
-            Last generic conversation: On school life in Trichy. Mentioned that they had a good time in school, used to go to the movies 20km away every weekend.
-
-            Important Guidelines:
-            1. Understand common typos and speech patterns (e.g., "tom" usually means "tomorrow")
-            2. For medicines: Describe the tablet by color/shape and purpose
-            3. For entertainment: Offer specific options rather than open-ended choices
-            4. For news: Start with local news, then offer national updates
-            5. If the user is feeling lonely or bored, start a general conversation with them. Continue from the last generic conversation you had with them.
-            6. Always confirm before sending messages to family
-            7. Keep track of medicine inventory and prompt for refills
-
-            If the request is for nothing, have a general conversation with the user especially if you notice they're feeling lonely or bored. E.g. Start the conversation with asking how they're feeling and continue the conversation based on your previous generic conversation with the user.
-            Continue the conversation based on your previous generic conversation with the user. E.g if the last time you spoke about their school life, maybe this time ask them more details or about college life.
-
-            Current Time: {timestamp}
-            """
-
-assistant_prompt_son = """
-You are Vaani, an empathetic voice assistant helping children manage care for their elderly parents.
-Keep responses informative and actionable. Focus on updates about:
-1. Health and medicine adherence
-2. Daily activities and mood
-3. Social interactions and family communications
-4. Any concerning patterns or issues
-
-Current Context:
-Parent: Ramesh (72, Chennai)
-Health Conditions: Diabetes, High Blood Pressure
-Recent Updates: Sugar test due today
-Medicine Schedule: 2 PM - Heart and BP medicines, 7 PM - Diabetes medicine
-Family Members: Rahul (you), Rohit (nephew)
-
-Current Time: {timestamp}
-"""
+# Planner states answered by handle_generic_query
+GENERIC_STATES = {"GenericQuery", "FollowUp"}
+
+# Sub-actors by name, with the memory each session starts them with
+SUB_ACTORS = {
+    "scheduler": (SchedulerActor, SchedulerMemory),
+    "entertainment": (EntertainmentActor, EntertainmentMemory),
+    "health": (HealthActor, HealthMemory),
+    "message": (MessageActor, MessageMemory),
+    "order": (OrderActor, MessageMemory),
+}
+
+@dataclass
+class Preroute:
+    """Planner run on an interim transcript."""
+    key: str  # normalized text
+    routes: int  # utterances routed before it started; it only applies to the next one
+    task: Optional[asyncio.Task] = None
+    started: bool = False  # the planner call was sent (the transcript stayed unchanged for the debounce delay)
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercased words only, so transcripts that differ in punctuation or casing compare equal."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+# System prompt templates by active user
+ASSISTANT_PROMPTS = {"dad": "assistant_senior", "son": "assistant_son"}
+CONTINUE_PROMPTS = {"dad": "continue_senior", "son": "continue_son"}
 
 class AssistantActor(Actor):
-    def __init__(self, initial_memory: Optional[AssistantMemory], actor_id: str = None):
-        super().__init__(initial_memory, actor_id)
+    def __init__(self, initial_memory: Optional[AssistantMemory], actor_id: str = None, **kwargs):
+        super().__init__(initial_memory, actor_id, **kwargs)
         self.chat_service = ChatService()
+        self.prompts = get_prompt_service()
+        self.planner_log = PlannerDecisionLog()
         self.llm = LLMFactory.get_chat_llm(
             llm_provider=LLMProvider.OPENAI,
             model_name="gpt-4o",
@@ -115,22 +87,191 @@ class AssistantActor(Actor):
         self.chat_llm = LLMFactory.get_chat_llm(
             llm_provider=LLMProvider.OPENAI,
             model_name="gpt-4o",
+            name="assistant_chat",
         )
-        self.scheduler_actor = SchedulerActor(initial_memory=SchedulerMemory())
-        self.entertainment_actor = EntertainmentActor(initial_memory=EntertainmentMemory())
-        self.health_actor = HealthActor(initial_memory=HealthMemory())
-        self.message_actor = MessageActor(initial_memory=MessageMemory())
-        self.order_actor = OrderActor(initial_memory=MessageMemory())
+        # Sub-actors are built on first use; most sessions only take the generic path
+        self.sub_actors: Dict[str, Actor] = {}
+        # Per-session sub-actor memory when sub-actors are leased from the shared pool
+        self.sub_actor_memories: Dict[str, Any] = {}
+        # Planner run on the latest interim transcript
+        self._preroute: Optional[Preroute] = None
+        self._routes = 0
+
+    def sub_actor_id(self, name: str) -> str:
+        return f"{self.id}/{name}"
+
+    def memory_classes(self) -> Dict[str, type]:
+        """Memory class of this actor and each of its sub-actors, by actor id."""
+        classes = {self.sub_actor_id(name): memory_cls for name, (_, memory_cls) in SUB_ACTORS.items()}
+        classes[self.id] = AssistantMemory
+        return classes
+
+    def sub_actor(self, name: str) -> Actor:
+        actor = self.sub_actors.get(name)
+        if actor is None or actor.stopped:
+            actor_cls, memory_cls = SUB_ACTORS[name]
+            # A failed turn resets the sub-actor's state machine; one that keeps failing is replaced here
+            actor = actor_cls(
+                initial_memory=memory_cls(),
+                actor_id=self.sub_actor_id(name),
+                supervision=Supervision.RESTART,
+                memory_store=self.memory_store,
+            )
+            self.sub_actors[name] = actor
+        return actor
+
+    def stop(self):
+        for actor in self.sub_actors.values():
+            actor.stop()
+        if self._preroute:
+            self._preroute.task.cancel()
+            self._preroute = None
+        super().stop()
+
+    async def ask_sub_actor(self, name: str, query_dto: QueryDTO):
+        with span("sub_actor", sub_actor=name, pooled=settings.ACTOR_POOL_ENABLED):
+            return await self._ask_sub_actor(name, query_dto)
+
+    async def _ask_sub_actor(self, name: str, query_dto: QueryDTO):
+        if not settings.ACTOR_POOL_ENABLED:
+            return await self.sub_actor(name).ask(query_dto)
+        actor_cls, memory_cls = SUB_ACTORS[name]
+        memory = self.sub_actor_memories.get(name)
+        if memory is None:
+            if self.memory_store:
+                memory = await self.memory_store.get(self.sub_actor_id(name), memory_cls)
+            memory = self.sub_actor_memories[name] = memory or memory_cls()
+        try:
+            async with get_actor_pool(actor_cls, memory_cls).lease(memory) as actor:
+                return await actor.ask(query_dto)
+        except Exception:
+            # The shell's restart only resets its own copy; start the session's state machine over too
+            memory = self.sub_actor_memories[name] = memory_cls()
+            raise
+        finally:
+            # Pooled shells don't own the memory, so persist it on their behalf
+            if self.memory_store:
+                self.memory_store.mark_dirty(self.sub_actor_id(name), memory)
 
     async def _on_receive(self, query_dto: QueryDTO):
-        messages = []
-        messages.append(SystemMessage(content=planner_prompt))
-        messages.extend(self.chat_service.create_messages(query_dto.session_dto.chat_history))
-        messages.append(HumanMessage(content=query_dto.message))
-        response = await self.llm.ainvoke(messages)
+        start = time.perf_counter()
+        response = await self._route(query_dto)
+        route_seconds.observe(time.perf_counter() - start, route=self.memory.current_state)
+        return response
+
+    async def _route(self, query_dto: QueryDTO):
+        # Taken up front, so an utterance answered without the planner doesn't leave it for a later one
+        preroute, self._preroute = self._preroute, None
+        try:
+            return await self._route_with(query_dto, preroute)
+        finally:
+            if preroute:
+                preroute.task.cancel()
+            self._routes += 1
+
+    async def _route_with(self, query_dto: QueryDTO, preroute: Optional[Preroute]):
+        if settings.INTENT_CLASSIFIER_ENABLED:
+            with span("planner", source="local") as planner_span:
+                prediction = get_intent_classifier().classify(query_dto.message, self.memory.current_state)
+                if prediction:
+                    planner_span.set(source=prediction.source, state=prediction.label, confidence=prediction.confidence)
+            if prediction:
+                logger.info("Local intent", label=prediction.label, confidence=prediction.confidence, source=prediction.source)
+                planner_decisions.inc(source=prediction.source)
+                return await self._handle_planner_state(PlannerState(type=prediction.label), query_dto)
+        if settings.SPECULATIVE_ROUTING:
+            return await self._speculative_receive(query_dto, preroute)
+        planner_state = await self._plan(query_dto, preroute)
+        return await self._handle_planner_state(planner_state, query_dto)
+
+    def preroute(self, message: str, session_dto: SessionDTO):
+        """
+        Start the planner on an interim transcript while the user is still speaking.
+        The decision is used if the final utterance has the same words, and dropped otherwise.
+        The planner is only called once the transcript has stayed the same for
+        VOICE_PREROUTE_DEBOUNCE_MS, since a request that was sent is billed even if cancelled.
+        Runs outside the mailbox and has no side effects until `_plan` takes the result.
+        """
+        key = normalize_utterance(message)
+        if len(key.split()) < settings.VOICE_PREROUTE_MIN_WORDS:
+            return
+        if self._preroute:
+            if self._preroute.key == key:
+                return
+            self._preroute.task.cancel()
+        preroute = Preroute(key=key, routes=self._routes)
+        preroute.task = asyncio.create_task(self._debounced_classify(preroute, message, session_dto))
+        # Errors surface as a miss in _plan; don't warn about them if the task is dropped
+        preroute.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._preroute = preroute
+
+    async def _debounced_classify(self, preroute: Preroute, message: str, session_dto: SessionDTO) -> PlannerState:
+        await asyncio.sleep(settings.VOICE_PREROUTE_DEBOUNCE_MS / 1000)
+        preroute.started = True
+        return await self._classify(message, session_dto)
+
+    async def _prerouted(self, preroute: Optional[Preroute], message: str) -> Optional[PlannerState]:
+        if preroute is None:
+            return None
+        if preroute.key != normalize_utterance(message):
+            planner_preroutes.inc(outcome="miss")
+            return None
+        if preroute.routes != self._routes:
+            # Started while the previous utterance was being answered, so planned without it in the history
+            planner_preroutes.inc(outcome="stale")
+            return None
+        if not preroute.started:
+            # Still waiting out the debounce delay; planning now is faster
+            planner_preroutes.inc(outcome="pending")
+            return None
+        try:
+            planner_state = await preroute.task
+        except Exception as e:
+            logger.warning("Prerouting failed", error=str(e))
+            planner_preroutes.inc(outcome="miss")
+            return None
+        planner_preroutes.inc(outcome="hit")
+        return planner_state
+
+    async def _classify(self, message: str, session_dto: SessionDTO) -> PlannerState:
+        messages = self.chat_service.build_messages(
+            self.prompts.render("planner"), session_dto, message, budget=settings.HISTORY_PLANNER_TOKEN_BUDGET
+        )
+        return await self.llm.ainvoke(messages)
+
+    async def _plan(self, query_dto: QueryDTO, preroute: Optional[Preroute] = None) -> PlannerState:
+        previous_state = self.memory.current_state
+        start = time.perf_counter()
+        with span("planner", source="llm") as planner_span:
+            response = await self._prerouted(preroute, query_dto.message)
+            planner_span.set(prerouted=response is not None)
+            if response is None:
+                response = await self._classify(query_dto.message, query_dto.session_dto)
+            planner_span.set(state=response.type)
+        latency_ms = (time.perf_counter() - start) * 1000
         logger.info("Planner State", response=response)
+        planner_decisions.inc(source="llm")
+        self.planner_log.record(query_dto.message, previous_state, response.type, latency_ms)
         self.memory.current_state = response.type
-        return await self._handle_planner_state(response, query_dto)
+        return response
+
+    async def _speculative_receive(self, query_dto: QueryDTO, preroute: Optional[Preroute] = None):
+        """
+        Start the generic chat reply while the planner is still classifying the query.
+        The reply is kept if the planner routes to the generic handler and cancelled otherwise.
+        """
+        speculation = Speculation(self.handle_generic_query(
+            PlannerState(type="GenericQuery"), replace(query_dto, stream=True)
+        ))
+        try:
+            planner_state = await self._plan(query_dto, preroute)
+        except BaseException:
+            speculation.cancel(reason="planner failed")
+            raise
+        if planner_state.type in GENERIC_STATES:
+            return await speculation.commit(stream=query_dto.stream)
+        speculation.cancel(reason=planner_state.type)
+        return await self._handle_planner_state(planner_state, query_dto)
     
     async def _handle_planner_state(self, planner_state: PlannerState, query_dto: QueryDTO):
         logger.info("Planner State", planner_state=planner_state)
@@ -150,96 +291,75 @@ class AssistantActor(Actor):
             return await handler(planner_state, query_dto)
         return await self.handle_generic_query(planner_state, query_dto)
 
+    def assistant_prompt(self, session_dto: SessionDTO, suffixes: Dict[str, str] = None) -> str:
+        """The active user's system prompt, with the profile of the session's user filled in."""
+        profile = self.prompts.profile(session_dto.profile_id)
+        user = session_dto.active_user.value
+        prompt = self.prompts.render(ASSISTANT_PROMPTS[user], profile)
+        if suffixes:
+            prompt += "\n" + self.prompts.render(suffixes[user], profile)
+        return prompt
+
     async def handle_generic_query(self, planner_state: PlannerState, query_dto: QueryDTO):
-        if query_dto.session_dto.active_user.value == "dad":
-            assistant_prompt = assistant_prompt_senior
-        elif query_dto.session_dto.active_user.value == "son":
-            assistant_prompt = assistant_prompt_son
-        else:  # Add default case
-            assistant_prompt = ""  # or whatever default prompt you want to use
-
-        messages = []
-        messages.append(SystemMessage(content=assistant_prompt.format(timestamp=datetime.now().isoformat())))
-        messages.extend(self.chat_service.create_messages(query_dto.session_dto.chat_history))
-        messages.append(HumanMessage(content=query_dto.message))
+        messages = self.chat_service.build_messages(
+            self.assistant_prompt(query_dto.session_dto), query_dto.session_dto, query_dto.message,
+            context={"Current Time": datetime.now().isoformat()},
+        )
+        return await self._chat_response(messages, query_dto)
+
+    async def _chat_response(self, messages: list, query_dto: QueryDTO) -> ResponseDTO:
+        if query_dto.stream:
+            return ResponseDTO(response="", artifact_url="", artifact_type="", stream=self.chat_llm.astream(messages))
         response = await self.chat_llm.ainvoke(messages)
         return ResponseDTO(response=response.content, artifact_url="", artifact_type="")
     
     async def handle_scheduler(self, planner_state: PlannerState, query_dto: QueryDTO):
-        response = await self.scheduler_actor.ask(query_dto)
+        response = await self.ask_sub_actor("scheduler", query_dto)
         if response:
             return ResponseDTO(response=response, artifact_url="", artifact_type="")
         else:
             return await self.handle_continue_conversation(planner_state, query_dto)
         
     async def handle_continue_conversation(self, planner_state: PlannerState, query_dto: QueryDTO, task_completed: str = None):
-        messages = []
-        if query_dto.session_dto.active_user.value == "dad":
-            continue_conversation_prompt = assistant_prompt_senior + """
-            You just completed a task : {task_completed}.
-              Continue the conversation with the user Maybe ask them about their Blood test results if you havem't asked before.
-            """
-            continue_conversation_prompt = continue_conversation_prompt.format(task_completed=task_completed, timestamp=datetime.now().isoformat())
-        elif query_dto.session_dto.active_user.value == "son":
-            continue_conversation_prompt = assistant_prompt_son + """
-            You just completed a task. Continue the conversation with the user.
-            """
-        
-        messages.append(SystemMessage(content=continue_conversation_prompt))
-        messages.extend(self.chat_service.create_messages(query_dto.session_dto.chat_history))
-        messages.append(HumanMessage(content=query_dto.message))
-        response = await self.chat_llm.ainvoke(messages)
-        return ResponseDTO(response=response.content, artifact_url="", artifact_type="")
+        context = {"Current Time": datetime.now().isoformat()}
+        if task_completed:
+            context["Task completed"] = task_completed
+        messages = self.chat_service.build_messages(
+            self.assistant_prompt(query_dto.session_dto, CONTINUE_PROMPTS), query_dto.session_dto, query_dto.message,
+            context=context,
+        )
+        return await self._chat_response(messages, query_dto)
 
     async def handle_entertainment(self, planner_state: PlannerState, query_dto: QueryDTO):
-        response =  await self.entertainment_actor.ask(query_dto)
+        response =  await self.ask_sub_actor("entertainment", query_dto)
         if response:
             return ResponseDTO(response=response, artifact_url="", artifact_type="")
         else:
             return await self.handle_continue_conversation(planner_state, query_dto)
 
     async def handle_news(self, planner_state: PlannerState, query_dto: QueryDTO):
-        messages = []
-        news_prompt = """
-        You are Vaani's news assistant. Since this is a voice interface:
-        1. Share one headline at a time
-        2. Pause after each headline
-        3. Ask if user wants to hear more details
-        4. For traffic updates, break information into small chunks
-        5. Ask if user wants to hear about other areas
-        
-        Current News Context:
-        Location: Chennai, Tamil Nadu
-        Important Events: PM Visit today, Metro inauguration
-        Weather: Sunny, 32°C
-        Traffic Updates: Expect congestion in T Nagar (11:00-11:30 AM)
-        India England T20 match today, India won by two wickets, India now leads the series 2-0
-        score : England 165/9 in 20 overs, India 166/8 in 19.2 overs
-        Tilak Verma was player of the match scoring 72 in 55 balls
-        """
-        
-        messages.append(SystemMessage(content=news_prompt))
-        messages.extend(self.chat_service.create_messages(query_dto.session_dto.chat_history))
-        messages.append(HumanMessage(content=query_dto.message))
-        response = await self.chat_llm.ainvoke(messages)
-        return ResponseDTO(response=response.content, artifact_url="", artifact_type="")
+        profile = self.prompts.profile(query_dto.session_dto.profile_id)
+        messages = self.chat_service.build_messages(
+            self.prompts.render("news", profile), query_dto.session_dto, query_dto.message
+        )
+        return await self._chat_response(messages, query_dto)
 
     async def handle_health(self, planner_state: PlannerState, query_dto: QueryDTO):
-        response = await self.health_actor.ask(query_dto)
+        response = await self.ask_sub_actor("health", query_dto)
         if response:
             return ResponseDTO(response=response, artifact_url="", artifact_type="")
         else:
             return await self.handle_continue_conversation(planner_state, query_dto)
 
     async def handle_communication(self, planner_state: PlannerState, query_dto: QueryDTO):
-        response = await self.message_actor.ask(query_dto)
+        response = await self.ask_sub_actor("message", query_dto)
         if response:
             return ResponseDTO(response=response, artifact_url="", artifact_type="")
         else:
             return await self.handle_continue_conversation(planner_state, query_dto)
         
     async def handle_order(self, planner_state: PlannerState, query_dto: QueryDTO):
-        response = await self.order_actor.ask(query_dto)
+        response = await self.ask_sub_actor("order", query_dto)
         if response:
             return ResponseDTO(response=response, artifact_url="", artifact_type="")
         else:
@@ -1,25 +1,66 @@
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional
 from app.actor.actor import Actor
 from app.actor.assistant_actor import AssistantActor
 from app.dto.assistant import AssistantMemory
 from app.dto.chat import ChatMessage
 from app.dto.coordinator import CoordinatorMemory
-from app.dto.session import QueryDTO, ResponseDTO
+from app.dto.session import QueryDTO, ResponseDTO, SessionDTO
+from app.services.history_manager import get_history_manager
 
 
 class CoordinatorActor(Actor):
-    def __init__(self, initial_memory: Optional[CoordinatorMemory], actor_id: str = None):
-        super().__init__(initial_memory, actor_id)
-        self.assistant_actor = AssistantActor(initial_memory=AssistantMemory(), actor_id="assistant")
-    
+    def __init__(self, initial_memory: Optional[CoordinatorMemory], actor_id: str = None, **kwargs):
+        super().__init__(initial_memory, actor_id, **kwargs)
+        self.assistant_actor = AssistantActor(
+            initial_memory=AssistantMemory(),
+            actor_id=f"{self.id}/assistant",
+            memory_store=self.memory_store,
+        )
+
+    def memory_classes(self) -> Dict[str, type]:
+        """Memory class of every actor in this coordinator's tree, by actor id."""
+        return {self.id: CoordinatorMemory, **self.assistant_actor.memory_classes()}
+
+    def stop(self):
+        self.assistant_actor.stop()
+        super().stop()
+
+    def preroute(self, message: str, session_dto: SessionDTO):
+        """Route an interim transcript ahead of the final utterance (see AssistantActor.preroute)."""
+        if self.memory.active_actor == "assistant":
+            self.assistant_actor.preroute(message, session_dto)
+
     async def _on_receive(self, query_dto: QueryDTO):
         if self.memory.active_actor == "assistant":
             response: ResponseDTO = await self.assistant_actor.ask(query_dto)
-            query_dto.session_dto.chat_history.append(ChatMessage(role="user", content=query_dto.message))
-            query_dto.session_dto.chat_history.append(ChatMessage(role="assistant", content=response.response))
+            if response.stream:
+                # The prompt is already built; record the user message now so the next turn
+                # plans with it even if this reply is still streaming
+                self._record_user_message(query_dto)
+                response.stream = self._record_stream(query_dto, response, response.stream)
+            else:
+                self._record_turn(query_dto, response)
             return response
-        
 
+    def _record_turn(self, query_dto: QueryDTO, response: ResponseDTO):
+        self._record_user_message(query_dto)
+        self._record_assistant_message(query_dto, response.response)
 
+    def _record_user_message(self, query_dto: QueryDTO):
+        query_dto.session_dto.chat_history.append(ChatMessage(role="user", content=query_dto.message))
 
+    def _record_assistant_message(self, query_dto: QueryDTO, content: str):
+        query_dto.session_dto.chat_history.append(ChatMessage(role="assistant", content=content))
+        get_history_manager().maybe_summarize(query_dto.session_dto)
 
+    async def _record_stream(self, query_dto: QueryDTO, response: ResponseDTO, stream: AsyncIterator[str]):
+        """Pass the stream through and record the reply, or the part that was sent if the stream is cut off."""
+        parts = []
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                yield delta
+        finally:
+            response.response = "".join(parts)
+            if response.response:
+                self._record_assistant_message(query_dto, response.response)
@@ -6,8 +6,8 @@ from app.services.chat_service import ChatService
 
 
 class PlannerActor(Actor):
-    def __init__(self, initial_memory: Optional[PlannerMemory], actor_id: str = None):
-        super().__init__(initial_memory, actor_id)
+    def __init__(self, initial_memory: Optional[PlannerMemory], actor_id: str = None, **kwargs):
+        super().__init__(initial_memory, actor_id, **kwargs)
         self.chat_service = ChatService()
 
     def _on_receive(self, query_dto: QueryDTO):
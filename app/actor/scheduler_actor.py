@@ -3,47 +3,19 @@ from typing import Optional
 
 from pydantic import BaseModel
 from app.actor.actor import Actor
+from app.core import settings
 from app.dto.scheduler import SchedulerMemory
 from app.dto.session import QueryDTO
 from app.models.models import Scheduler
 from app.services.chat_service import ChatService
 from app.services.llm_factory import LLMFactory, LLMProvider
-from langchain.schema import HumanMessage, SystemMessage
+from app.services.prompt_service import get_prompt_service
 import structlog
 from asgiref.sync import sync_to_async
 
 logger = structlog.get_logger(__name__)
 
 
-scheduler_prompt = """
-        You are Vaani's scheduler assistant. You help set reminders and manage schedules.
-        IMPORTANT: Understand that "tom" means "tomorrow" in user messages.
-        You need to identify the schedule time, schedule type and the schedule message who the reminder is for. 
-        The schedule can be for the user itself or his Son or Dad.
-        If you are not able to identify any of the required fields, you need to ask the user to provide the missing information.
-        you can ask the user by setting message to the user. 
-        If all the information is available, set message to None.
-
-        Your user type is {user_type}.
-
-        Schedule type can be one of the following:
-        Recurring - The reminder is a recurring reminder.
-        One Time - The reminder is a one time reminder.
-        Other information:
-        timestamp : {timestamp}
-        
-        Current Context:
-        - Sugar test is due today
-        - Medicine Schedule: 2 PM and 7 PM
-        - Rohit is planning to visit today
-        
-        When setting reminders:
-        1. Always confirm the date (today/tomorrow)
-        2. Ask for specific time if not provided
-        3. Ask for reminder details if not clear
-        4. Be proactive about health-related reminders
-        """
-
 class SchedulerState(BaseModel):
     user_type: Optional[str] = None
     schedule_time: Optional[datetime] = None
@@ -53,20 +25,26 @@ class SchedulerState(BaseModel):
 
 
 class SchedulerActor(Actor):
-    def __init__(self, initial_memory: Optional[SchedulerMemory], actor_id: str = None):
-        super().__init__(initial_memory, actor_id)
+    def __init__(self, initial_memory: Optional[SchedulerMemory], actor_id: str = None, **kwargs):
+        super().__init__(initial_memory, actor_id, **kwargs)
         self.chat_service = ChatService()
+        self.prompts = get_prompt_service()
         self.llm = LLMFactory.get_chat_llm(
             llm_provider=LLMProvider.OPENAI,
             model_name="gpt-4o",
-            structured_cls=SchedulerState
+            structured_cls=SchedulerState,
+            # Reminder times are resolved relative to the prompt timestamp
+            cache_timestamp_granularity=60,
         )
 
     async def _on_receive(self, query_dto: QueryDTO):        
-        messages = []
-        messages.append(SystemMessage(content=scheduler_prompt.format(user_type=query_dto.session_dto.active_user, timestamp=datetime.now().isoformat())))
-        messages.extend(self.chat_service.create_messages(query_dto.session_dto.chat_history))
-        messages.append(HumanMessage(content=query_dto.message))
+        messages = self.chat_service.build_messages(
+            self.prompts.render("scheduler", user_type=query_dto.session_dto.active_user.value),
+            query_dto.session_dto,
+            query_dto.message,
+            budget=settings.HISTORY_TASK_TOKEN_BUDGET,
+            context={"Current Time": datetime.now().isoformat()},
+        )
         scheduler_state = await self.llm.ainvoke(messages)
         if scheduler_state.message:
             return scheduler_state.message
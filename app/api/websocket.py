@@ -1,141 +1,236 @@
 from fastapi import WebSocket, WebSocketDisconnect, Depends
+import asyncio
 import uuid
 import json
-from app.actor.coordinator_actor import CoordinatorActor
-from app.dto.coordinator import CoordinatorMemory
-from app.dto.session import QueryDTO, ResponseDTO, SessionDTO, UserType
+from contextlib import contextmanager
+from typing import Optional
+from app.core import settings
+from app.dto.session import QueryDTO, ResponseDTO
+from app.services.session_registry import LiveSession, SessionLimitExceeded, SessionRegistry
 from app.services.transcription_service import TranscriptionService
-from app.services.chat_service import ChatService
 from app.services.audio_service import AudioService
-import hashlib
-from django.core.cache import cache
+from app.services.metrics import gauge, histogram
+from app.services.tracing import span
+from app.services.tts_pipeline import StreamingTTSPipeline
+from app.services.voice_turn import AudioTurnPipeline, TurnTimer
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+websocket_connections = gauge("websocket_connections", "Open WebSocket connections")
+live_sessions = gauge("live_sessions", "Sessions held in memory by this worker")
+turn_seconds = histogram(
+    "websocket_turn_seconds",
+    "Seconds from receiving a turn to sending its last frame, by input (text, audio, audio_stream) and response type",
+)
+
 class WebSocketManager:
     def __init__(self):
         self.transcription_service = TranscriptionService()
         self.audio_service = AudioService()
-        self.coordinator_actor = None
+        self.tts_pipeline = StreamingTTSPipeline(self.audio_service)
+        self.audio_turn_pipeline = AudioTurnPipeline(self.audio_service, self.tts_pipeline)
+        self.session_registry = SessionRegistry()
+        live_sessions.set_function(lambda: len(self.session_registry))
+
+    @contextmanager
+    def _turn(self, session: LiveSession, input: str, response_type: str, **attributes):
+        """Trace and time one turn; the histogram's count is the turn rate."""
+        with span("turn", session_id=session.id, input=input, response_type=response_type, **attributes):
+            with turn_seconds.time(input=input, response_type=response_type):
+                yield
 
     async def handle_websocket(self, websocket: WebSocket, session_id: str, role: str, language: str):
-        print("New WebSocket connection attempt")
+        logger.debug("WebSocket connection attempt", session_id=session_id)
         await websocket.accept()
-        self.session_dto = SessionDTO(
-                id=session_id, 
-                active_user=UserType(role),  # or UserType.SON depending on your needs
-                language=language
-            )
-        print(f"WebSocket connected: {session_id}")
-        self.coordinator_actor = CoordinatorActor(initial_memory=CoordinatorMemory(active_actor="assistant"))
+        try:
+            session = await self.session_registry.acquire(session_id, role, language)
+        except SessionLimitExceeded as e:
+            logger.warning("Rejecting WebSocket connection", session_id=session_id, error=str(e))
+            await websocket.close(code=1013, reason="Server busy, try again later")
+            return
+        logger.info("WebSocket connected", session_id=session_id, role=role, language=language)
+        session.sockets.add(websocket)
+        websocket_connections.inc()
 
         try:
             while True:
                 try:
                     # Receive message from client
                     message = await websocket.receive()
-                    print(f"Received message: {message}")  # Debug log
-                    
+                    # Payloads are logged by size only: audio frames can be hundreds of kilobytes
+                    logger.debug("Received frame", session_id=session_id, type=message["type"],
+                                 bytes=len(message.get("bytes") or b""), chars=len(message.get("text") or ""))
+
                     if message["type"] == "websocket.receive":
                         if "bytes" in message:
-                            await self.handle_audio_message(websocket, message["bytes"])
+                            await self.handle_audio_message(websocket, session, message["bytes"])
                         elif "text" in message:
-                            await self.handle_text_message(websocket, message["text"])
+                            await self.handle_text_message(websocket, session, message["text"])
 
                 except WebSocketDisconnect:
-                    print(f"Client disconnected: {session_id}")
+                    logger.info("WebSocket disconnected", session_id=session_id)
                     break  # Exit the loop on disconnect
                 except RuntimeError as e:
                     if "Cannot call 'receive' once a disconnect message has been received" in str(e):
-                        print(f"Client disconnected (runtime error): {session_id}")
+                        logger.info("WebSocket disconnected", session_id=session_id)
                         break  # Exit the loop on disconnect
                     raise  # Re-raise other runtime errors
 
         except Exception as e:
-            print(f"Error in WebSocket handler: {str(e)}")
+            logger.error("Error in WebSocket handler", session_id=session_id, error=str(e))
             try:
                 if websocket.client_state.CONNECTED:  # Only try to close if still connected
                     await websocket.close(code=1011, reason=str(e))
             except:
                 pass  # Ignore any errors during close
-
-    async def handle_audio_message(self, websocket: WebSocket, audio_data: bytes):
-        print(f"Received audio data: {len(audio_data)} bytes")
-
-        # Transcribe audio to text
-        print("Transcribing audio...")
-        text = await self.transcription_service.transcribe_audio(audio_data)
-        print(f"Transcribed text: {text}")
-
-        # Get response and send as audio
-        await self._process_and_send_response(websocket, text, "audio")
-
-    async def handle_text_message(self, websocket: WebSocket, text: str):
+        finally:
+            websocket_connections.dec()
+            session.sockets.discard(websocket)
+            await self.close_audio_stream(session, cancel=True)
+            await self.session_registry.release(session)
+
+    async def handle_audio_message(self, websocket: WebSocket, session: LiveSession, audio_data: bytes):
+        if session.transcription:
+            # Streaming mode: forward the chunk as it is recorded
+            session.transcription.send(audio_data)
+            return
+
+        logger.debug("Received audio", session_id=session.id, bytes=len(audio_data))
+        timer = TurnTimer(session.id)
+
+        with self._turn(session, "audio", "audio"):
+            # Transcribe audio to text
+            text = await self.transcription_service.transcribe_audio(audio_data)
+            logger.debug("Transcribed audio", session_id=session.id, text=text)
+            timer.mark("transcribed")
+
+            # Get response and send as audio
+            await self._process_and_send_response(websocket, session, text, "audio", timer=timer)
+
+    async def handle_text_message(self, websocket: WebSocket, session: LiveSession, text: str):
         try:
             # Parse the text message as JSON
-            print(f"Received raw text: {text}")
             data = json.loads(text)
+            if data.get("type") == "audio_start":
+                await self.open_audio_stream(websocket, session, data.get("responseType", "audio"))
+                return
+            if data.get("type") == "audio_end":
+                await self.close_audio_stream(session)
+                return
+
             message = data.get("message")
             response_type = data.get("responseType", "text")  # Default to text response
+            stream = bool(data.get("stream", False))
 
-            print(f"Parsed message: {message}, response_type: {response_type}")
+            logger.debug("Received text message", session_id=session.id, message=message,
+                         response_type=response_type, stream=stream)
 
             if not message:
                 error_message = "No message provided"
-                print(f"Error: {error_message}")
+                logger.warning("Rejected text message", session_id=session.id, error=error_message)
                 await websocket.send_text(json.dumps({"error": error_message}))
                 return
 
             # Process message and send response
-            await self._process_and_send_response(websocket, message, response_type)
+            with self._turn(session, "text", response_type, stream=stream):
+                await self._process_and_send_response(websocket, session, message, response_type, stream)
 
         except json.JSONDecodeError as e:
-            print(f"JSON decode error: {str(e)}")
+            logger.warning("Invalid JSON message", session_id=session.id, error=str(e), text=text)
             error_message = "Invalid JSON format"
             await websocket.send_text(json.dumps({"error": error_message}))
         except Exception as e:
-            print(f"Error processing message: {str(e)}")
+            logger.error("Error processing message", session_id=session.id, error=str(e))
             error_message = f"Error processing message: {str(e)}"
             await websocket.send_text(json.dumps({"error": error_message}))
 
-    async def _process_and_send_response(self, websocket: WebSocket, message: str, response_type: str):
+    async def open_audio_stream(self, websocket: WebSocket, session: LiveSession, response_type: str):
+        """
+        Start streaming transcription: subsequent binary frames are forwarded to the
+        live backend and every completed utterance is answered as soon as it ends.
+        """
+        await self.close_audio_stream(session)
+        on_interim = None
+        if settings.VOICE_PREROUTE_ENABLED:
+            # Start routing while the user is still speaking
+            on_interim = lambda text: session.coordinator_actor.preroute(text, session.session_dto)
+        session.transcription = await self.transcription_service.start_stream(session.session_dto.language, on_interim)
+        session.transcription_task = asyncio.create_task(
+            self._respond_to_utterances(websocket, session, session.transcription, response_type)
+        )
+
+    async def close_audio_stream(self, session: LiveSession, cancel: bool = False):
+        """Flush the live stream and wait for the last utterance to be answered, or cancel it."""
+        transcription, task = session.transcription, session.transcription_task
+        if transcription is None:
+            return
+        session.transcription = None
+        session.transcription_task = None
+        try:
+            if cancel:
+                # Don't wait for the backend to flush transcripts nobody will answer
+                task.cancel()
+                transcription.close()
+            else:
+                await transcription.finish()
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("Error closing transcription stream", session_id=session.id, error=str(e))
+
+    async def _respond_to_utterances(self, websocket: WebSocket, session: LiveSession, transcription, response_type: str):
+        async for utterance in transcription.utterances():
+            logger.debug("Transcribed utterance", session_id=session.id, text=utterance)
+            timer = TurnTimer(session.id)
+            timer.mark("transcribed")
+            with self._turn(session, "audio_stream", response_type):
+                await websocket.send_text(json.dumps({"type": "transcript", "text": utterance}))
+                await self._process_and_send_response(websocket, session, utterance, response_type, timer=timer)
+
+    async def _process_and_send_response(self, websocket: WebSocket, session: LiveSession, message: str, response_type: str,
+                                         stream: bool = False, timer: Optional[TurnTimer] = None):
         """Common method to process messages and send responses."""
         try:
-            # Get chat response
-            print(f"Getting chat response for: {message}")
-            response: ResponseDTO = await self.coordinator_actor.ask(QueryDTO(message=message, session_dto=self.session_dto))
-            print(f"Chat response received: {response}")
+            session.touch()
+            query_dto = QueryDTO(message=message, session_dto=session.session_dto, stream=stream or response_type == "audio")
 
             if response_type == "audio":
-                # Check cache for audio response
-                cache_key = f"audio_{hashlib.sha256(response.response.encode()).hexdigest()}"
-                logger.info("Getting cached audio response", message=cache_key)
-                audio_response = cache.get(cache_key)
-                
-                if not audio_response:
-                    # Convert response to speech if not in cache
-                    print("Converting to speech...")
-                    audio_response = await self.audio_service.text_to_speech(response.response)
-                    print(f"Audio response generated: {len(audio_response)} bytes")
-                    # Cache the audio response
-                    logger.info("Setting cached audio response", message=cache_key)
-                    cache.set(cache_key, audio_response)
-                else:
-                    print("Using cached audio response")
-
-                await websocket.send_bytes(audio_response)
-                await websocket.send_text(json.dumps({"response": response.response, 
-                                                      "artifact_url": response.artifact_url, 
-                                                      "artifact_type": response.artifact_type}))
+                await self.audio_turn_pipeline.run(
+                    websocket, session.coordinator_actor.ask(query_dto), timer or TurnTimer(session.id)
+                )
+                return
+
+            response: ResponseDTO = await session.coordinator_actor.ask(query_dto)
+
+            if query_dto.stream:
+                await self._send_streamed_response(websocket, response)
             else:
                 # Send text response
-                print("Sending text response...")
-                await websocket.send_text(json.dumps({"response": response.response, "artifact_url": response.artifact_url, "artifact_type": response.artifact_type}))
-            
-            print("Response sent to client")
+                with span("ws.send", frame="text"):
+                    await websocket.send_text(json.dumps({"response": response.response, "artifact_url": response.artifact_url, "artifact_type": response.artifact_type}))
+            logger.debug("Response sent", session_id=session.id, response_type=response_type,
+                         stream=query_dto.stream, response=response.response)
 
         except Exception as e:
-            print(f"Error in process_and_send_response: {str(e)}")
+            logger.error("Error processing response", session_id=session.id, error=str(e))
             error_message = f"Error processing response: {str(e)}"
-            await websocket.send_text(json.dumps({"error": error_message})) 
\ No newline at end of file
+            await websocket.send_text(json.dumps({"error": error_message}))
+
+    async def _send_streamed_response(self, websocket: WebSocket, response: ResponseDTO):
+        """
+        Send the reply as incremental frames: {"type": "delta", "delta": ...} per chunk,
+        followed by a {"type": "final", "response": ...} frame with the full text.
+        """
+        with span("ws.send", frame="stream") as send_span:
+            deltas = 0
+            if response.stream:
+                async for delta in response.stream:
+                    await websocket.send_text(json.dumps({"type": "delta", "delta": delta}))
+                    deltas += 1
+            send_span.set(deltas=deltas)
+            await websocket.send_text(json.dumps({"type": "final",
+                                                  "response": response.response,
+                                                  "artifact_url": response.artifact_url,
+                                                  "artifact_type": response.artifact_type})) 
\ No newline at end of file
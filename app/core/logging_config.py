@@ -0,0 +1,167 @@
+"""
+structlog setup for the app.
+
+The event loop only filters, samples and summarizes each event before putting
+it on a bounded queue; a listener thread renders it (console or JSON) and
+writes it to stdout. Records are dropped rather than blocking when the writer
+falls behind.
+"""
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+import structlog
+
+from app.core import settings
+from app.services.metrics import counter
+
+log_records_dropped = counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+    "fatal": logging.CRITICAL,
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SampleEvents:
+    """Keep a `rate` fraction of events at or below `max_level`; more severe events are always kept."""
+
+    def __init__(self, rate: float, max_level: str):
+        self.rate = rate
+        self.max_level = logging.getLevelName(max_level.upper())
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if self.rate < 1 and LEVELS.get(method_name, logging.INFO) <= self.max_level:
+            if random.random() >= self.rate:
+                raise structlog.DropEvent
+            event_dict["sample_rate"] = self.rate
+        return event_dict
+
+
+class SummarizePayloads:
+    """Log bytes as their size and cut strings longer than `max_chars`."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        for key, value in event_dict.items():
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                event_dict[key] = f"<{len(value)} bytes>"
+            elif isinstance(value, str) and len(value) > self.max_chars:
+                event_dict[key] = f"{value[:self.max_chars]}... ({len(value)} chars)"
+        return event_dict
+
+
+class SummarizeObjects(SummarizePayloads):
+    """Render values that aren't JSON scalars as their repr, cut to `max_chars`. Runs on the writer thread."""
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        for key, value in event_dict.items():
+            if key.startswith("_") or key == "exc_info" or isinstance(value, (str, int, float, bool, type(None))):
+                continue
+            text = repr(value)
+            if len(text) > self.max_chars:
+                text = f"{text[:self.max_chars]}... ({len(text)} chars)"
+            event_dict[key] = text
+        return event_dict
+
+
+def capture_exc_info(logger, method_name: str, event_dict: dict) -> dict:
+    # The exception has to be captured here, before the event leaves the raising thread
+    if event_dict.get("exc_info") is True or (method_name == "exception" and "exc_info" not in event_dict):
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def add_record_timestamp(logger, method_name: str, event_dict: dict) -> dict:
+    record = event_dict.get("_record")
+    if record is not None:
+        event_dict["timestamp"] = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
+    return event_dict
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records unformatted, so rendering happens on the listener thread, and never block."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing when stopped with a full queue
+        self.queue.put(self._sentinel)
+
+
+def configure_logging():
+    """Route structlog and standard library logging through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+    renderer = (
+        structlog.processors.JSONRenderer()
+        if settings.LOG_FORMAT == "json"
+        else structlog.dev.ConsoleRenderer(colors=False)
+    )
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=[structlog.stdlib.add_log_level, structlog.stdlib.add_logger_name],
+        processors=[
+            add_record_timestamp,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            SummarizeObjects(settings.LOG_MAX_FIELD_CHARS),
+            *([structlog.processors.format_exc_info] if settings.LOG_FORMAT == "json" else []),
+            renderer,
+        ],
+    )
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+    log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _listener = DrainingQueueListener(log_queue, output)
+
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            SampleEvents(settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_MAX_LEVEL),
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            capture_exc_info,
+            SummarizePayloads(settings.LOG_MAX_FIELD_CHARS),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    _listener.start()
+
+
+def stop_logging():
+    """Write out the queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
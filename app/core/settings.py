@@ -61,3 +61,118 @@ ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY")
 SARVAM_API_KEY: str = os.getenv("SARVAM_API_KEY")
 
 EMAIL_BACKEND = "django_ses.SESBackend"
+
+# WebSocket sessions
+SESSION_MAX_LIVE: int = int(os.getenv("SESSION_MAX_LIVE", "500"))
+SESSION_IDLE_TIMEOUT: int = int(os.getenv("SESSION_IDLE_TIMEOUT", "900"))  # seconds
+SESSION_EVICTION_INTERVAL: int = int(os.getenv("SESSION_EVICTION_INTERVAL", "60"))  # seconds
+# Share sessions between workers through Redis (leases, saved state and handoff on reconnect)
+DISTRIBUTED_SESSIONS: bool = os.getenv("DISTRIBUTED_SESSIONS", "false").lower() == "true"
+SESSION_LEASE_TTL: int = int(os.getenv("SESSION_LEASE_TTL", "30"))  # seconds
+SESSION_HANDOFF_TIMEOUT: float = float(os.getenv("SESSION_HANDOFF_TIMEOUT", "5"))  # seconds
+SESSION_HANDOFF_POLL_INTERVAL: float = float(os.getenv("SESSION_HANDOFF_POLL_INTERVAL", "0.5"))  # seconds
+SESSION_STATE_TTL: int = int(os.getenv("SESSION_STATE_TTL", str(60 * 60 * 24 * 7)))  # seconds
+# Actor mailboxes
+ACTOR_MAILBOX_SIZE: int = int(os.getenv("ACTOR_MAILBOX_SIZE", "32"))
+ACTOR_BACKPRESSURE: str = os.getenv("ACTOR_BACKPRESSURE", "block")  # block, drop_oldest or reject
+ACTOR_SUPERVISION: str = os.getenv("ACTOR_SUPERVISION", "resume")  # resume, restart or stop
+ACTOR_MAX_RESTARTS: int = int(os.getenv("ACTOR_MAX_RESTARTS", "3"))
+ACTOR_RESTART_WINDOW: int = int(os.getenv("ACTOR_RESTART_WINDOW", "60"))  # seconds
+# Persisted actor memory: "redis", "postgres" or "none"
+ACTOR_MEMORY_BACKEND: str = os.getenv("ACTOR_MEMORY_BACKEND", "redis")
+ACTOR_MEMORY_FLUSH_INTERVAL: float = float(os.getenv("ACTOR_MEMORY_FLUSH_INTERVAL", "5"))  # seconds
+ACTOR_MEMORY_BATCH_SIZE: int = int(os.getenv("ACTOR_MEMORY_BATCH_SIZE", "100"))  # flush early once this many are dirty
+ACTOR_MEMORY_CACHE_SIZE: int = int(os.getenv("ACTOR_MEMORY_CACHE_SIZE", "10000"))
+ACTOR_MEMORY_REDIS_TTL: int = int(os.getenv("ACTOR_MEMORY_REDIS_TTL", str(60 * 60 * 24 * 7)))  # seconds
+# Lease sub-actors from a process-wide pool of shells instead of building them per session
+ACTOR_POOL_ENABLED: bool = os.getenv("ACTOR_POOL_ENABLED", "false").lower() == "true"
+ACTOR_POOL_MAX_IDLE: int = int(os.getenv("ACTOR_POOL_MAX_IDLE", "16"))  # idle shells kept per actor type
+
+# Text to speech
+TTS_MAX_CONCURRENCY: int = int(os.getenv("TTS_MAX_CONCURRENCY", "3"))
+# Send audio chunks as they arrive from the provider instead of one MP3 frame per sentence
+TTS_STREAM_CHUNKS: bool = os.getenv("TTS_STREAM_CHUNKS", "false").lower() == "true"
+AUDIO_CACHE_TIMEOUT: int = int(os.getenv("AUDIO_CACHE_TIMEOUT", str(60 * 60 * 24)))  # seconds
+# Open a connection to the TTS provider while the reply is being generated
+TTS_WARMUP_ENABLED: bool = os.getenv("TTS_WARMUP_ENABLED", "true").lower() == "true"
+
+# Outbound HTTP (TTS providers)
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_PER_HOST_LIMIT: int = int(os.getenv("HTTP_PER_HOST_LIMIT", "10"))
+HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "30"))  # seconds
+HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))  # seconds
+HTTP_MAX_RETRY_DELAY: float = float(os.getenv("HTTP_MAX_RETRY_DELAY", "5"))  # seconds; longer Retry-After fails fast
+
+# Speech to text
+TRANSCRIPTION_BACKEND: str = os.getenv("TRANSCRIPTION_BACKEND", "deepgram")  # deepgram | fake
+FAKE_TRANSCRIPT: str = os.getenv("FAKE_TRANSCRIPT", "Remind me to take my diabetes medicine at 7 PM")
+# Run the planner on interim transcripts and reuse the result if the final utterance matches
+VOICE_PREROUTE_ENABLED: bool = os.getenv("VOICE_PREROUTE_ENABLED", "false").lower() == "true"
+VOICE_PREROUTE_MIN_WORDS: int = int(os.getenv("VOICE_PREROUTE_MIN_WORDS", "3"))
+VOICE_PREROUTE_DEBOUNCE_MS: int = int(os.getenv("VOICE_PREROUTE_DEBOUNCE_MS", "300"))  # unchanged interim before planning it
+
+# Start the generic chat reply in parallel with the planner and keep it on GenericQuery/FollowUp
+SPECULATIVE_ROUTING: bool = os.getenv("SPECULATIVE_ROUTING", "false").lower() == "true"
+
+# Local intent classifier in front of the LLM planner
+INTENT_CLASSIFIER_ENABLED: bool = os.getenv("INTENT_CLASSIFIER_ENABLED", "false").lower() == "true"
+INTENT_CONFIDENCE_THRESHOLD: float = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9"))
+INTENT_MODEL_PATH: str = os.getenv("INTENT_MODEL_PATH", str(BASE_DIR.parent / "data" / "intent_model.json"))
+# JSONL log of LLM planner decisions used to train the intent model; empty disables logging
+PLANNER_DECISION_LOG: str = os.getenv("PLANNER_DECISION_LOG", "")
+
+# Logging: events are rendered and written by a background thread fed through a bounded queue
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "console")  # console | json
+LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # fraction of sampled events kept
+LOG_SAMPLE_MAX_LEVEL: str = os.getenv("LOG_SAMPLE_MAX_LEVEL", "INFO")  # events at or below this level are sampled
+LOG_MAX_FIELD_CHARS: int = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))  # longer values are cut, bytes logged as their size
+LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records dropped when the writer falls this far behind
+
+# Per-turn tracing: "jsonl" appends spans to TRACE_EXPORT_PATH, "otlp" posts them to an OpenTelemetry collector
+TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")  # none | jsonl | otlp
+TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_COLLECTOR_URL: str = os.getenv("TRACE_COLLECTOR_URL", "http://localhost:4318/v1/traces")
+TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # fraction of turns traced
+TRACE_FLUSH_INTERVAL: float = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))  # seconds
+TRACE_MAX_BUFFER: int = int(os.getenv("TRACE_MAX_BUFFER", "10000"))  # finished spans held between flushes
+
+# Retriever queries over an async psycopg 3 pool. Off by default, which keeps the ORM on psycopg2;
+# enabling it means installing requirements-async-db.txt, which moves the whole ORM to psycopg 3.
+# Without the pool, queries run through the ORM and fused (RRF) queries always go as one statement
+VECTOR_SEARCH_ASYNC_DB: bool = os.getenv("VECTOR_SEARCH_ASYNC_DB", "false").lower() == "true"
+VECTOR_DB_POOL_MIN_SIZE: int = int(os.getenv("VECTOR_DB_POOL_MIN_SIZE", "1"))
+VECTOR_DB_POOL_MAX_SIZE: int = int(os.getenv("VECTOR_DB_POOL_MAX_SIZE", "10"))  # concurrent KNN queries per worker
+VECTOR_DB_POOL_TIMEOUT: float = float(os.getenv("VECTOR_DB_POOL_TIMEOUT", "10"))  # seconds to wait for a connection
+# Query embedding cache: float32 vectors in-process, raw float32 bytes in Redis
+EMBEDDING_CACHE_TTL: int = int(os.getenv("EMBEDDING_CACHE_TTL", str(60 * 60 * 24 * 7)))  # seconds, 0 disables
+EMBEDDING_CACHE_LOCAL_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_LOCAL_MAX_ENTRIES", "2048"))  # ~6 KB each at 1536 dims
+# Fused (RRF) retrieval embeds all query variants in one request and runs their KNN lookups as one statement
+VECTOR_RRF_BATCHED: bool = os.getenv("VECTOR_RRF_BATCHED", "true").lower() == "true"
+# Bulk ingestion: documents per embedding request and write transaction, embedding requests in flight
+INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_MAX_CONCURRENCY: int = int(os.getenv("INGEST_MAX_CONCURRENCY", "4"))
+
+# Chat history sent with prompts, in tokens per call site
+HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))  # conversational replies
+HISTORY_TASK_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TASK_TOKEN_BUDGET", "800"))  # structured task extraction
+HISTORY_PLANNER_TOKEN_BUDGET: int = int(os.getenv("HISTORY_PLANNER_TOKEN_BUDGET", "300"))  # routing
+# Older turns are summarized once the unsummarized history exceeds this many tokens
+HISTORY_SUMMARIZE_AFTER_TOKENS: int = int(os.getenv("HISTORY_SUMMARIZE_AFTER_TOKENS", "2000"))
+HISTORY_KEEP_RECENT_MESSAGES: int = int(os.getenv("HISTORY_KEEP_RECENT_MESSAGES", "6"))
+
+# Prompt templates (app/prompts)
+PROMPT_CACHE_SIZE: int = int(os.getenv("PROMPT_CACHE_SIZE", "256"))  # rendered prompts kept in memory
+DEFAULT_USER_PROFILE: str = os.getenv("DEFAULT_USER_PROFILE", "default")  # profile id from app/prompts/profiles.json
+
+# LLM response cache
+LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", str(60 * 60 * 24)))  # seconds, 0 disables
+LLM_CACHE_LOCAL_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_LOCAL_MAX_ENTRIES", "1024"))
+LLM_CACHE_TIMESTAMP_GRANULARITY: int = int(os.getenv("LLM_CACHE_TIMESTAMP_GRANULARITY", "300"))  # seconds
+
+# Connection pool shared by all OpenAI chat models
+LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "200"))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
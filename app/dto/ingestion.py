@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class IngestionResult:
+    job_id: Optional[str]
+    documents: int  # written by this run
+    chunks: int
+    seconds: float
+    resumed_from: int = 0  # documents already written by earlier runs of the job
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class UpsertResult:
+    source: str
+    version: Optional[str]
+    inserted: int  # new or changed texts, embedded by this run
+    unchanged: int  # already stored, not embedded again
+    deleted: int  # stored rows of the source that are no longer in the input
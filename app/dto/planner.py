@@ -4,3 +4,10 @@ from dataclasses import dataclass
 @dataclass
 class PlannerMemory:
     pass
+
+
+@dataclass
+class IntentPrediction:
+    label: str
+    confidence: float
+    source: str  # "rule" or "model"
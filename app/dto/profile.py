@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """Details about the cared-for user that are injected into prompts."""
+    name: str
+    age: int
+    location: str
+    health_conditions: str = ""
+    family_contacts: str = ""
+    medicine_schedule: str = ""
@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
+from typing import AsyncIterator, Optional
 
 from app.dto.chat import ChatMessage
 
@@ -13,14 +14,24 @@ class SessionDTO:
     active_user: UserType
     language: str
     chat_history: list[ChatMessage] = field(default_factory=list)
+    # Rolling summary of chat_history[:summarized_turns]
+    summary: str = ""
+    summarized_turns: int = 0
+    # Key into app/prompts/profiles.json for the user this session is about; None uses DEFAULT_USER_PROFILE
+    profile_id: Optional[str] = None
 
 @dataclass
 class QueryDTO:
     message: str
     session_dto: SessionDTO
+    stream: bool = False
 
 @dataclass
 class ResponseDTO:
     response: str
     artifact_url: str
     artifact_type: str
+    # Set instead of `response` when the query asked for a streamed reply;
+    # `response` is filled in once the stream has been consumed.
+    stream: Optional[AsyncIterator[str]] = field(default=None, repr=False)
+
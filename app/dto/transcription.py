@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TranscriptEvent:
+    text: str
+    is_final: bool = False
+    # True when the speaker has stopped talking and the utterance is complete
+    speech_final: bool = False
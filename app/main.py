@@ -1,8 +1,10 @@
 import os
 from fastapi import FastAPI, WebSocket, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import time
 import django
 from django.conf import settings
 from asgiref.sync import sync_to_async
@@ -19,7 +21,19 @@ def configure_django():
 # Initialize Django
 configure_django()
 
+from app.core.logging_config import configure_logging, stop_logging
+
+configure_logging()
+
 from app.api.websocket import WebSocketManager
+from app.services.async_db import close_async_database
+from app.services.http_client import get_http_client
+from app.services.llm_factory import LLMFactory
+from app.services.actor_memory_store import get_actor_memory_store
+from app.services.prompt_service import get_prompt_service
+from app.services.metrics import histogram, render as render_metrics
+from app.services.runtime_metrics import instrument_database, instrument_executors
+from app.services.tracing import get_tracer
 from app.models.models import Scheduler
 
 
@@ -36,6 +50,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+http_request_seconds = histogram("http_request_seconds", "HTTP request latency by method, route and status")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template keeps path parameters out of the labels
+    route = request.scope.get("route")
+    http_request_seconds.observe(time.perf_counter() - start, method=request.method,
+                                 route=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
+
+
+@app.on_event("startup")
+async def startup():
+    get_prompt_service()
+    instrument_database()
+    instrument_executors(asyncio.get_running_loop())
+    websocket_manager.session_registry.start()
+    if get_actor_memory_store():
+        get_actor_memory_store().start()
+    get_tracer().start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await websocket_manager.session_registry.stop()
+    if get_actor_memory_store():
+        await get_actor_memory_store().stop()
+    # Spans may be exported over the shared HTTP client
+    await get_tracer().stop()
+    await get_http_client().aclose()
+    await close_async_database()
+    await LLMFactory.aclose()
+    stop_logging()
+
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -59,6 +110,10 @@ async def websocket_endpoint(websocket: WebSocket):
         
     await websocket_manager.handle_websocket(websocket, session_id, role, language)
 
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request):
     return templates.TemplateResponse("dashboard.html", {
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.14 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0002_scheduler'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActorMemory',
+            fields=[
+                ('actor_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('memory_type', models.CharField(max_length=255)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'actor_memories',
+            },
+        ),
+    ]
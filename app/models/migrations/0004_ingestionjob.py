@@ -0,0 +1,24 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0003_actormemory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('job_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('documents_done', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ingestion_jobs',
+            },
+        ),
+    ]
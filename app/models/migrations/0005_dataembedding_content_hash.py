@@ -0,0 +1,29 @@
+# Generated by Django 4.2.14 on 2026-10-18 13:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # data_embeddings is created outside these migrations, so the columns are added with
+    # plain SQL that is safe to run against tables that already have them
+
+    dependencies = [
+        ('models', '0004_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                'ALTER TABLE data_embeddings ADD COLUMN IF NOT EXISTS source varchar(255) NULL',
+                'ALTER TABLE data_embeddings ADD COLUMN IF NOT EXISTS version varchar(255) NULL',
+                'ALTER TABLE data_embeddings ADD COLUMN IF NOT EXISTS content_hash varchar(64) NULL',
+                'CREATE INDEX IF NOT EXISTS ix_source_content_hash ON data_embeddings (source, content_hash)',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS ix_source_content_hash',
+                'ALTER TABLE data_embeddings DROP COLUMN IF EXISTS content_hash',
+                'ALTER TABLE data_embeddings DROP COLUMN IF EXISTS version',
+                'ALTER TABLE data_embeddings DROP COLUMN IF EXISTS source',
+            ],
+        ),
+    ]
@@ -43,6 +43,31 @@ class Scheduler(models.Model):
     def __str__(self):
         return f"Schedule for {self.recipient} at {self.schedule_time}" 
 
+class ActorMemory(models.Model):
+    """Serialized actor memory, keyed by the actor's id."""
+    actor_id = models.CharField(max_length=255, primary_key=True)
+    memory_type = models.CharField(max_length=255)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'actor_memories'
+
+    def __str__(self):
+        return f"{self.memory_type} for {self.actor_id}"
+
+class IngestionJob(models.Model):
+    """Progress of a resumable bulk ingestion: the number of input documents already written."""
+    job_id = models.CharField(max_length=255, primary_key=True)
+    documents_done = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ingestion_jobs'
+
+    def __str__(self):
+        return f"{self.job_id}: {self.documents_done} documents"
+
 EMBEDDING_DIMENSIONS = 1536
 
 
@@ -53,10 +78,15 @@ class DataEmbedding(models.Model):
     text = models.TextField(blank=False, null=False, default="")
     metadata = models.JSONField(blank=True, null=True)
     embedding = VectorField(dimensions=EMBEDDING_DIMENSIONS)
+    # Set by ingestion; rows of a source are matched on content_hash when it's re-ingested
+    source = models.CharField(max_length=255, null=True, blank=True)
+    version = models.CharField(max_length=255, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
 
     class Meta:
         db_table = "data_embeddings"
         indexes = [
+            models.Index(fields=["source", "content_hash"], name="ix_source_content_hash"),
             HnswIndex(
                 name="ix_embedding_cosine",
                 fields=["embedding"],
@@ -0,0 +1,77 @@
+"""
+Measure per-connection setup cost under a burst of concurrent connections.
+
+Opens N sessions through the SessionRegistry (what the WebSocket handler does
+on connect) in concurrent waves and reports setup latency and resident memory
+per session. No provider calls are made.
+
+    python -m app.scripts.benchmark_connection_storm --connections 500 --concurrency 50
+    python -m app.scripts.benchmark_connection_storm --eager-sub-actors
+
+--eager-sub-actors builds every sub-actor on connect, the way AssistantActor
+used to, for comparison with lazy construction.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.core.settings")
+django.setup()
+
+from app.actor.assistant_actor import SUB_ACTORS
+from app.services.session_registry import SessionRegistry
+
+
+async def storm(connections: int, concurrency: int, eager_sub_actors: bool) -> tuple[SessionRegistry, list[float]]:
+    registry = SessionRegistry(max_sessions=connections, idle_timeout=3600)
+    latencies = []
+
+    async def connect(index: int):
+        start = time.perf_counter()
+        session = await registry.acquire(f"storm-{index}", "dad", "en")
+        if eager_sub_actors:
+            for name in SUB_ACTORS:
+                session.coordinator_actor.assistant_actor.sub_actor(name)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for offset in range(0, connections, concurrency):
+        await asyncio.gather(*(connect(i) for i in range(offset, min(offset + concurrency, connections))))
+    return registry, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--eager-sub-actors", action="store_true", help="Build all sub-actors on connect")
+    args = parser.parse_args()
+
+    # Warm up imports and the shared chat model registry
+    asyncio.run(storm(1, 1, args.eager_sub_actors))
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    # Keep the registry alive so its sessions count towards resident memory
+    registry, latencies = asyncio.run(storm(args.connections, args.concurrency, args.eager_sub_actors))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    print(f"Connections: {args.connections}, concurrency {args.concurrency}, "
+          f"sub-actors {'eager' if args.eager_sub_actors else 'lazy'}")
+    print(f"Total: {elapsed:.2f}s ({args.connections / elapsed:.0f} connections/s)")
+    print(f"Setup latency: mean {statistics.mean(latencies):.2f} ms, "
+          f"p50 {latencies[len(latencies) // 2]:.2f} ms, p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms")
+    print(f"Memory per session: {(current - baseline) / args.connections / 1024:.1f} KiB "
+          f"(peak {(peak - baseline) / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
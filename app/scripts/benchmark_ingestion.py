@@ -0,0 +1,135 @@
+"""
+Measure bulk ingestion throughput (documents per second) and peak memory.
+
+Ingests the same generated corpus twice into data_embeddings: the way
+`PGVector.add_texts` does it (one embedding call over the whole list, one
+bulk_create in one transaction), and through `IngestionPipeline` (chunks
+embedded concurrently, one transaction per chunk). Embeddings are faked with
+a fixed latency per request and per document, so no provider calls are made;
+writes go to the configured database.
+
+    python -m app.scripts.benchmark_ingestion --documents 20000 --request-ms 300
+    python -m app.scripts.benchmark_ingestion --batch-size 512 --concurrency 8 --skip-baseline
+
+Rows written by the benchmark are tagged in their metadata and deleted at the
+end unless --keep is given.
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+import uuid
+from typing import Iterator, List
+
+import django
+import numpy as np
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.core.settings")
+django.setup()
+
+from langchain_core.documents import Document as LangChainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.models.models import EMBEDDING_DIMENSIONS, DataEmbedding, IngestionJob
+from app.services.ingestion import IngestionPipeline
+from app.services.vector_store import PGVector
+
+TEXT = "Walking for thirty minutes after dinner helps keep blood sugar steady. " * 8
+
+
+class FakeEmbeddings(Embeddings):
+    """Random vectors, with the latency of an embedding API that takes at most `max_batch` texts per request."""
+
+    def __init__(self, request_ms: float, document_us: float, max_batch: int = 1000):
+        self.request_ms = request_ms
+        self.document_us = document_us
+        self.max_batch = max_batch
+        self.rng = np.random.default_rng(0)
+
+    def _latency(self, texts: List[str]) -> float:
+        return self.request_ms / 1000 + len(texts) * self.document_us / 1e6
+
+    def _vectors(self, texts: List[str]) -> List[List[float]]:
+        return self.rng.random((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        # Requests are sent one after the other, as OpenAIEmbeddings does for a long list
+        for offset in range(0, len(texts), self.max_batch):
+            batch = texts[offset:offset + self.max_batch]
+            time.sleep(self._latency(batch))
+            vectors.extend(self._vectors(batch))
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._latency(texts))
+        return self._vectors(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def corpus(documents: int, run_id: str) -> Iterator[LangChainDocument]:
+    for index in range(documents):
+        yield LangChainDocument(
+            page_content=f"Document {index}. {TEXT}",
+            metadata={"title": f"Benchmark document {index}", "benchmark": run_id},
+        )
+
+
+def baseline(store: PGVector, documents: int, run_id: str):
+    texts, metadatas = [], []
+    for document in corpus(documents, run_id):
+        texts.append(document.page_content)
+        metadatas.append(document.metadata)
+    store.add_embeddings(texts, store.embeddings.embed_documents(texts), metadatas)
+
+
+def measure(name: str, run, documents: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10}{seconds:>10.2f}{documents / seconds:>12.1f}{peak / 2**20:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=None, help="Defaults to INGEST_BATCH_SIZE")
+    parser.add_argument("--concurrency", type=int, default=None, help="Defaults to INGEST_MAX_CONCURRENCY")
+    parser.add_argument("--request-ms", type=float, default=250, help="Fake embedding latency per request")
+    parser.add_argument("--document-us", type=float, default=200, help="Fake embedding latency per document")
+    parser.add_argument("--skip-baseline", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark rows")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex
+    store = PGVector()
+    store.embedding_function = FakeEmbeddings(args.request_ms, args.document_us)
+    options = {"batch_size": args.batch_size, "max_concurrency": args.concurrency}
+    pipeline = IngestionPipeline(store, **{key: value for key, value in options.items() if value is not None})
+
+    print(f"{args.documents} documents, {EMBEDDING_DIMENSIONS} dimensions, batch size {pipeline.batch_size}, "
+          f"concurrency {pipeline.max_concurrency}, {args.request_ms} ms + {args.document_us} µs/doc per request\n")
+    print(f"{'':<10}{'seconds':>10}{'docs/sec':>12}{'peak MiB':>12}")
+    try:
+        if not args.skip_baseline:
+            measure("add_texts", lambda: baseline(store, args.documents, run_id), args.documents)
+        measure(
+            "pipeline",
+            lambda: asyncio.run(pipeline.ingest(corpus(args.documents, run_id), job_id=f"benchmark-{run_id}")),
+            args.documents,
+        )
+    finally:
+        if not args.keep:
+            DataEmbedding.objects.filter(metadata__benchmark=run_id).delete()
+            IngestionJob.objects.filter(job_id=f"benchmark-{run_id}").delete()
+    print("\npeak MiB is the largest Python heap traced during the run (tracemalloc).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark the local intent classifier against logged LLM planner decisions.
+
+Collect decisions by running the app with PLANNER_DECISION_LOG set, then:
+
+    python -m app.scripts.benchmark_intent_classifier data/planner_decisions.jsonl
+    python -m app.scripts.benchmark_intent_classifier data/planner_decisions.jsonl --save
+
+The LLM planner's labels are treated as ground truth. The report shows how many
+turns the classifier answers locally, how accurate those answers are, and the
+planner latency saved per turn. --save trains on the whole log and writes the
+model to INTENT_MODEL_PATH.
+
+The keyword rules are also checked against REGRESSION_CASES, and a small model
+against UNSEEN_QUERY_CASES, with or without a log:
+
+    python -m app.scripts.benchmark_intent_classifier
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Optional
+
+from app.core import settings
+from app.services.intent_classifier import (
+    IntentClassifier,
+    NaiveBayesIntentModel,
+    classify_by_rules,
+    read_decision_log,
+)
+
+# (query, label the rules must answer with, or None when the LLM planner has to decide)
+REGRESSION_CASES: list[tuple[str, Optional[str]]] = [
+    ("I need to walk in order to stay fit", None),
+    ("I walk every day in order to eat more fruits", None),
+    ("Tell me about Tom Hanks", None),
+    ("What is my medicine schedule today", None),
+    ("Remind me tom at 7 pm to call the doctor", "Scheduler"),
+    ("Set an alarm for tom morning", "Scheduler"),
+    ("Please schedule a call with the doctor", "Scheduler"),
+    ("Order two plates of idli", "Order"),
+    ("Order biryani from Swiggy", "Order"),
+    ("Did I take my tablets", "Health"),
+]
+
+# Follow-ups whose words never appeared in training: the model must leave them to the planner
+# instead of answering from the previous state alone
+UNSEEN_QUERY_TRAINING = [
+    {"query": "Remind me at 6 in the evening", "previous_state": "Scheduler", "label": "Scheduler"},
+    {"query": "Also at 8 tomorrow", "previous_state": "Scheduler", "label": "Scheduler"},
+    {"query": "Make it 7 instead", "previous_state": "Scheduler", "label": "Scheduler"},
+    {"query": "And one more on Sunday", "previous_state": "Scheduler", "label": "Scheduler"},
+    {"query": "Play an old Kishore Kumar song", "previous_state": "Entertainment", "label": "Entertainment"},
+]
+UNSEEN_QUERY_CASES: list[tuple[str, Optional[str]]] = [
+    ("Xylophone quokka", "Scheduler"),
+]
+
+
+def check_regressions(threshold: float) -> int:
+    classifier = IntentClassifier(None, threshold)
+    failures = 0
+    print("Rule regressions:")
+    for query, expected in REGRESSION_CASES:
+        prediction = classifier.classify(query)
+        label = prediction.label if prediction else None
+        ok = label == expected
+        failures += not ok
+        print(f"  {'ok' if ok else 'FAIL':<6}{query!r} -> {label or 'planner'} (expected {expected or 'planner'})")
+    classifier = IntentClassifier(NaiveBayesIntentModel().fit(UNSEEN_QUERY_TRAINING), threshold)
+    for query, previous_state in UNSEEN_QUERY_CASES:
+        prediction = classifier.classify(query, previous_state)
+        label = prediction.label if prediction else None
+        failures += label is not None
+        print(f"  {'ok' if label is None else 'FAIL':<6}{query!r} after {previous_state} -> {label or 'planner'} "
+              f"(expected planner)")
+    print()
+    return failures
+
+
+def evaluate(classifier: IntentClassifier, examples: list[dict]) -> dict:
+    answered = correct = 0
+    latencies = []
+    confusions = Counter()
+    for example in examples:
+        start = time.perf_counter()
+        prediction = classifier.classify(example["query"], example.get("previous_state"))
+        latencies.append((time.perf_counter() - start) * 1000)
+        if prediction is None:
+            continue
+        answered += 1
+        if prediction.label == example["label"]:
+            correct += 1
+        else:
+            confusions[(example["label"], prediction.label)] += 1
+    return {
+        "coverage": answered / len(examples),
+        "accuracy": correct / answered if answered else 0.0,
+        "routing_accuracy": 1 - (answered - correct) / len(examples),
+        "latency_ms": statistics.mean(latencies),
+        "confusions": confusions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", help="JSONL planner decision log")
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true", help="Train on the whole log and save the model")
+    parser.add_argument("--model-path", default=settings.INTENT_MODEL_PATH)
+    args = parser.parse_args()
+
+    failures = check_regressions(args.threshold)
+    if not args.log:
+        raise SystemExit(1 if failures else 0)
+
+    examples = read_decision_log(args.log)
+    random.Random(args.seed).shuffle(examples)
+    split = max(1, int(len(examples) * args.test_fraction))
+    test, train = examples[:split], examples[split:]
+
+    model = NaiveBayesIntentModel().fit(train)
+    planner_latency = statistics.mean(e["latency_ms"] for e in examples if e.get("latency_ms") is not None)
+
+    print(f"Examples: {len(examples)} (train {len(train)}, test {len(test)}), threshold {args.threshold}")
+    print(f"Labels: {dict(Counter(e['label'] for e in examples))}")
+    print(f"Mean LLM planner latency: {planner_latency:.0f} ms\n")
+    print(f"{'classifier':<14}{'coverage':>10}{'accuracy':>10}{'routing acc':>13}{'latency':>11}{'saved/turn':>12}")
+    for name, classifier in [
+        ("rules", IntentClassifier(None, args.threshold)),
+        ("rules+model", IntentClassifier(model, args.threshold)),
+    ]:
+        result = evaluate(classifier, test)
+        saved = result["coverage"] * (planner_latency - result["latency_ms"])
+        print(f"{name:<14}{result['coverage']:>10.1%}{result['accuracy']:>10.1%}{result['routing_accuracy']:>13.1%}"
+              f"{result['latency_ms']:>9.3f}ms{saved:>10.0f}ms")
+        for (expected, predicted), count in result["confusions"].most_common(5):
+            print(f"    {expected} -> {predicted}: {count}")
+
+    rule_hits = sum(1 for e in test if classify_by_rules(e["query"]))
+    print(f"\nQueries matching any rule: {rule_hits / len(test):.1%}")
+
+    if args.save:
+        NaiveBayesIntentModel().fit(examples).save(args.model_path)
+        print(f"Saved model trained on {len(examples)} examples to {args.model_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Measure the logging overhead of one turn on the calling (event loop) thread.
+
+Replays the log output of a voice turn twice: the way the WebSocket handler
+used to log it (prints of every raw frame and step, full cached responses at
+info level through the default structlog printer), and through
+`configure_logging` (queued records, sampled and size-capped events rendered
+on a writer thread). Output goes to --output, /dev/null by default; point it
+at a file to include real disk writes.
+
+    python -m app.scripts.benchmark_logging --turns 2000 --audio-kb 64
+    python -m app.scripts.benchmark_logging --level DEBUG --sample-rate 0.1 --format json
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import time
+
+import structlog
+
+from app.core import settings
+from app.dto.session import ResponseDTO
+
+MESSAGE = "Remind me to take my diabetes medicine at 7 PM"
+RESPONSE = "Sure Ramesh, I will remind you at 7 PM to take your diabetes medicine. " * 6
+
+
+def print_turn(logger, frame: dict, response: ResponseDTO):
+    """What one audio turn logged before: prints in the WebSocket handler plus info-level service logs."""
+    print(f"Received message: {frame}")  # Debug log
+    print(f"Received audio data: {len(frame['bytes'])} bytes")
+    print("Transcribing audio...")
+    print(f"Transcribed text: {MESSAGE}")
+    print(f"Getting chat response for: {MESSAGE}")
+    logger.info("Getting cached response", message="a" * 64)
+    logger.info("Planner State", response="type='GenericQuery'")
+    logger.info("Getting cached response", message="b" * 64)
+    logger.info("Setting cached response", message=response)
+    logger.info("Getting cached audio response", message="audio_" + "c" * 64)
+    logger.info("Setting cached audio response", message="audio_" + "c" * 64)
+    logger.info("Voice turn", session_id="bench", transcribed_ms=120, routed_ms=480, first_audio_ms=900, done_ms=1500)
+    print("Response sent to client")
+
+
+def structured_turn(logger, frame: dict, response: ResponseDTO):
+    """The same turn with the current log calls."""
+    logger.debug("Received frame", session_id="bench", type=frame["type"], bytes=len(frame["bytes"]), chars=0)
+    logger.debug("Received audio", session_id="bench", bytes=len(frame["bytes"]))
+    logger.debug("Transcribed audio", session_id="bench", text=MESSAGE)
+    logger.debug("Getting cached response", call_site="planner", key="a" * 64)
+    logger.info("Planner State", response="type='GenericQuery'")
+    logger.debug("Getting cached response", call_site="assistant_chat", key="b" * 64)
+    logger.debug("Setting cached response", call_site="assistant_chat", key="b" * 64, response=response)
+    logger.debug("Getting cached audio response", key="audio_" + "c" * 64)
+    logger.debug("Setting cached audio response", key="audio_" + "c" * 64, bytes=48000)
+    logger.info("Voice turn", session_id="bench", transcribed_ms=120, routed_ms=480, first_audio_ms=900, done_ms=1500)
+
+
+def run(turn, logger, turns: int, frame: dict, response: ResponseDTO) -> list[float]:
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        turn(logger, frame, response)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def report(name: str, latencies: list[float], drain_ms: float, dropped: int):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<12}{statistics.mean(latencies):>10.1f}{statistics.median(latencies):>10.1f}{p99:>10.1f}"
+          f"{drain_ms:>12.1f}{dropped:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--audio-kb", type=int, default=64, help="Size of the binary frame of each turn")
+    parser.add_argument("--output", default=os.devnull)
+    parser.add_argument("--level", default=settings.LOG_LEVEL)
+    parser.add_argument("--format", default=settings.LOG_FORMAT, choices=["console", "json"])
+    parser.add_argument("--sample-rate", type=float, default=settings.LOG_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    frame = {"type": "websocket.receive", "bytes": os.urandom(args.audio_kb * 1024)}
+    response = ResponseDTO(response=RESPONSE, artifact_url="", artifact_type="")
+    results = []
+
+    with open(args.output, "w") as output, contextlib.redirect_stdout(output):
+        structlog.reset_defaults()
+        results.append(("print", run(print_turn, structlog.get_logger("bench"), args.turns, frame, response), 0.0, 0))
+
+        from app.core.logging_config import configure_logging, log_records_dropped, stop_logging
+
+        settings.LOG_LEVEL = args.level
+        settings.LOG_FORMAT = args.format
+        settings.LOG_SAMPLE_RATE = args.sample_rate
+        configure_logging()
+        latencies = run(structured_turn, structlog.get_logger("bench"), args.turns, frame, response)
+        start = time.perf_counter()
+        stop_logging()
+        results.append(("structured", latencies, (time.perf_counter() - start) * 1000, int(log_records_dropped.get())))
+
+    print(f"{args.turns} turns, {args.audio_kb} KB audio frames, level {args.level}, "
+          f"format {args.format}, sample rate {args.sample_rate}, output {args.output}\n")
+    print(f"{'':<12}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'drain ms':>12}{'dropped':>10}")
+    for name, latencies, drain_ms, dropped in results:
+        report(name, latencies, drain_ms, dropped)
+    print("\nµs per turn on the calling thread; drain is the time to write out what was still queued,")
+    print("dropped the records discarded because the queue (LOG_QUEUE_SIZE) was full.")
+
+
+if __name__ == "__main__":
+    main()
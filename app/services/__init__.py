@@ -1,13 +0,0 @@
-class PromptService:
-    def __init__(self):
-        pass
-
-
-    def create_prompt(self, prompt_name: str) -> str:
-        pass
-
-    def get_assistant_prompt(self) -> str:
-        prompt = "You are a helpful Voice Assistant"
-
-    def get_coordinator_prompt(self) -> str:
-        pass
@@ -0,0 +1,231 @@
+import asyncio
+import dataclasses
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from app.core import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import counter
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+actor_memory_loads = counter("actor_memory_loads_total", "Actor memory lookups by result (cached, loaded, missing)")
+actor_memory_writes = counter("actor_memory_writes_total", "Actor memories written to the backend")
+actor_memory_flushes = counter("actor_memory_flushes_total", "Write-behind flushes by trigger (timer, size, stop)")
+
+
+def serialize_memory(memory: Any) -> bytes:
+    """Compact JSON of a dataclass memory; fields still at their default are omitted."""
+    data = {}
+    for field in dataclasses.fields(memory):
+        value = getattr(memory, field.name)
+        if field.default is not dataclasses.MISSING and value == field.default:
+            continue
+        data[field.name] = value
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+
+def deserialize_memory(memory_cls: Type, data: bytes) -> Any:
+    """Rebuild a dataclass memory, ignoring fields the class no longer has."""
+    values = json.loads(data)
+    names = {field.name for field in dataclasses.fields(memory_cls)}
+    return memory_cls(**{name: value for name, value in values.items() if name in names})
+
+
+# Cached marker for actors with nothing persisted, so new sessions don't query the backend per actor
+_ABSENT = object()
+
+
+def memory_type(memory_cls: Type) -> str:
+    return f"{memory_cls.__module__}.{memory_cls.__qualname__}"
+
+
+class ActorMemoryBackend(ABC):
+    """Bulk storage of serialized actor memories."""
+
+    @abstractmethod
+    async def load_many(self, actor_ids: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        """Return {actor_id: (memory_type, data)} for the ids that exist."""
+        pass
+
+    @abstractmethod
+    async def save_many(self, records: Dict[str, Tuple[str, bytes]]):
+        pass
+
+
+class RedisActorMemoryBackend(ActorMemoryBackend):
+    def __init__(self, timeout: int = settings.ACTOR_MEMORY_REDIS_TTL):
+        self.timeout = timeout
+
+    @staticmethod
+    def _key(actor_id: str) -> str:
+        return f"actor_memory_{actor_id}"
+
+    async def load_many(self, actor_ids: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        keys = {self._key(actor_id): actor_id for actor_id in actor_ids}
+        # Cache calls are thread-safe; don't queue them behind ORM work on the shared sync thread
+        found = await sync_to_async(cache.get_many, thread_sensitive=False)(list(keys))
+        return {keys[key]: tuple(value) for key, value in found.items()}
+
+    async def save_many(self, records: Dict[str, Tuple[str, bytes]]):
+        await sync_to_async(cache.set_many, thread_sensitive=False)(
+            {self._key(actor_id): record for actor_id, record in records.items()},
+            timeout=self.timeout,
+        )
+
+
+class PostgresActorMemoryBackend(ActorMemoryBackend):
+    async def load_many(self, actor_ids: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        from app.models.models import ActorMemory
+
+        rows = await sync_to_async(list)(
+            ActorMemory.objects.filter(actor_id__in=list(actor_ids)).values_list("actor_id", "memory_type", "data")
+        )
+        return {actor_id: (type_name, bytes(data)) for actor_id, type_name, data in rows}
+
+    async def save_many(self, records: Dict[str, Tuple[str, bytes]]):
+        from app.models.models import ActorMemory
+
+        rows = [
+            ActorMemory(actor_id=actor_id, memory_type=type_name, data=data)
+            for actor_id, (type_name, data) in records.items()
+        ]
+        await sync_to_async(ActorMemory.objects.bulk_create)(
+            rows,
+            update_conflicts=True,
+            unique_fields=["actor_id"],
+            update_fields=["memory_type", "data", "updated_at"],
+        )
+
+
+class ActorMemoryStore:
+    """
+    Read-through, write-behind store for actor memories.
+
+    Memories are cached in-process; `mark_dirty` only records the memory, and
+    dirty memories are written to the backend in one batch every
+    `flush_interval` seconds or once `batch_size` are pending. Memories that
+    serialize to what was last written are skipped.
+    """
+
+    def __init__(
+        self,
+        backend: ActorMemoryBackend,
+        flush_interval: float = settings.ACTOR_MEMORY_FLUSH_INTERVAL,
+        batch_size: int = settings.ACTOR_MEMORY_BATCH_SIZE,
+        cache_size: int = settings.ACTOR_MEMORY_CACHE_SIZE,
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._cache = LRUCache(cache_size)
+        self._written = LRUCache(cache_size)
+        self._dirty: Dict[str, Any] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    async def get(self, actor_id: str, memory_cls: Type) -> Optional[Any]:
+        memory = self._cache.get(actor_id)
+        if memory is None:
+            await self.prefetch({actor_id: memory_cls})
+            memory = self._cache.get(actor_id)
+            actor_memory_loads.inc(result="missing" if memory is _ABSENT else "loaded")
+        else:
+            actor_memory_loads.inc(result="cached")
+        return None if memory is _ABSENT else memory
+
+    async def prefetch(self, memory_classes: Dict[str, Type]):
+        """Load the uncached memories, given {actor_id: memory class}, in one backend round trip."""
+        missing = [actor_id for actor_id in memory_classes if self._cache.get(actor_id) is None]
+        if not missing:
+            return
+        records = await self.backend.load_many(missing)
+        for actor_id in missing:
+            if actor_id not in records:
+                self._cache.set(actor_id, _ABSENT)
+        for actor_id, (type_name, data) in records.items():
+            memory_cls = memory_classes[actor_id]
+            if memory_type(memory_cls) != type_name:
+                logger.warning("Skipping actor memory of unexpected type", actor_id=actor_id, memory_type=type_name)
+                self._cache.set(actor_id, _ABSENT)
+                continue
+            self._cache.set(actor_id, deserialize_memory(memory_cls, data))
+            self._written.set(actor_id, data)
+
+    def invalidate(self, actor_ids: Iterable[str]):
+        """Drop cached memories so the next read goes to the backend. Unflushed memories are kept."""
+        for actor_id in actor_ids:
+            if actor_id not in self._dirty:
+                self._cache.delete(actor_id)
+                self._written.delete(actor_id)
+
+    def mark_dirty(self, actor_id: str, memory: Any):
+        self._cache.set(actor_id, memory)
+        self._dirty[actor_id] = memory
+        if len(self._dirty) >= self.batch_size and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.create_task(self.flush(trigger="size"))
+
+    async def flush(self, trigger: str = "timer"):
+        async with self._flush_lock:
+            dirty, self._dirty = self._dirty, {}
+            records = {}
+            for actor_id, memory in dirty.items():
+                data = serialize_memory(memory)
+                if self._written.get(actor_id) != data:
+                    records[actor_id] = (memory_type(type(memory)), data)
+            if not records:
+                return
+            try:
+                await self.backend.save_many(records)
+            except Exception as e:
+                logger.error("Failed to flush actor memories", count=len(records), error=str(e))
+                # Retry on the next flush unless the memory was marked dirty again since
+                for actor_id, memory in dirty.items():
+                    self._dirty.setdefault(actor_id, memory)
+                return
+            for actor_id, (_, data) in records.items():
+                self._written.set(actor_id, data)
+            actor_memory_writes.inc(len(records))
+            actor_memory_flushes.inc(trigger=trigger)
+            logger.info("Flushed actor memories", count=len(records), trigger=trigger)
+
+    def start(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._run_flush_loop())
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush(trigger="stop")
+
+    async def _run_flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+ACTOR_MEMORY_BACKENDS = {
+    "redis": RedisActorMemoryBackend,
+    "postgres": PostgresActorMemoryBackend,
+}
+
+_actor_memory_store: Optional[ActorMemoryStore] = None
+
+
+def get_actor_memory_store() -> Optional[ActorMemoryStore]:
+    """Process-wide store for the configured ACTOR_MEMORY_BACKEND, or None if persistence is off."""
+    global _actor_memory_store
+    if _actor_memory_store is None and settings.ACTOR_MEMORY_BACKEND in ACTOR_MEMORY_BACKENDS:
+        _actor_memory_store = ActorMemoryStore(ACTOR_MEMORY_BACKENDS[settings.ACTOR_MEMORY_BACKEND]())
+    return _actor_memory_store
@@ -0,0 +1,95 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.db import connections
+from django.db.models import QuerySet
+
+from app.core import settings
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class AsyncDatabase:
+    """
+    Read queries on an async psycopg 3 connection pool, next to the Django ORM.
+
+    Querysets are compiled by Django and run on the pool, so they don't hop to
+    asgiref's single ORM thread and run concurrently up to the pool size.
+    Connection settings come from the Django database alias.
+
+    Optional: needs requirements-async-db.txt and VECTOR_SEARCH_ASYNC_DB.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        min_size: int = settings.VECTOR_DB_POOL_MIN_SIZE,
+        max_size: int = settings.VECTOR_DB_POOL_MAX_SIZE,
+        timeout: float = settings.VECTOR_DB_POOL_TIMEOUT,
+    ):
+        from psycopg.conninfo import make_conninfo
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        db = connections[alias].settings_dict
+        conninfo = make_conninfo(
+            dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"], host=db["HOST"], port=db["PORT"]
+        )
+        self.alias = alias
+        self.pool = AsyncConnectionPool(
+            conninfo, min_size=min_size, max_size=max_size, timeout=timeout,
+            kwargs={"autocommit": True, "row_factory": dict_row}, open=False,
+        )
+        self._opened = False
+
+    async def open(self):
+        if not self._opened:
+            self._opened = True
+            await self.pool.open()
+
+    async def fetch(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        await self.open()
+        async with self.pool.connection() as connection:
+            cursor = await connection.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def fetch_queryset(self, queryset: QuerySet) -> List[Dict[str, Any]]:
+        """Rows of a `.values(...)` queryset, as dicts keyed by the selected names."""
+        sql, params = queryset.query.get_compiler(using=self.alias).as_sql()
+        return await self.fetch(sql, params)
+
+    async def close(self):
+        if self._opened:
+            await self.pool.close()
+            self._opened = False
+
+
+def _uses_psycopg3(alias: str) -> bool:
+    # Compiled queryset params carry driver-specific adapters (JSON filters), so both sides must agree
+    try:
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    except ImportError:
+        return False
+    return connections[alias].vendor == "postgresql" and is_psycopg3
+
+
+_async_database: Optional[AsyncDatabase] = None
+_unavailable = False
+
+
+def get_async_database() -> Optional[AsyncDatabase]:
+    """The shared pool, or None when it's disabled or Django isn't running on psycopg 3 with psycopg_pool."""
+    global _async_database, _unavailable
+    if _async_database is None and not _unavailable:
+        if settings.VECTOR_SEARCH_ASYNC_DB and _uses_psycopg3("default"):
+            try:
+                _async_database = AsyncDatabase()
+            except ImportError as e:
+                logger.warning("Async database pool unavailable", error=str(e))
+        _unavailable = _async_database is None
+    return _async_database
+
+
+async def close_async_database():
+    if _async_database is not None:
+        await _async_database.close()
@@ -1,21 +1,78 @@
 # from openai import AsyncOpenAI
-import requests
+import hashlib
+import time
+from typing import AsyncIterator
 from app.core import settings
-import asyncio
+from app.services.http_client import get_http_client
+from app.services.metrics import counter, histogram
+from app.services.tracing import get_tracer
+from django.core.cache import cache
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+tts_cache_lookups = counter("tts_cache_lookups_total", "Synthesized audio cache lookups by result (hit, miss)")
+tts_request_seconds = histogram("tts_request_seconds", "Latency of full-text TTS provider requests")
+tts_first_chunk_seconds = histogram(
+    "tts_first_chunk_seconds", "Time to the first audio bytes of streamed TTS provider requests"
+)
 
 class AudioService:
     def __init__(self):
         # self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.api_key = settings.ELEVENLABS_API_KEY
         self.base_url = "https://api.elevenlabs.io/v1"
+        self.voice_id = "C2RGMrNBTZaNfddRPeRH"
+        self.http_client = get_http_client()
 
-    async def text_to_speech(self, text: str) -> bytes:
-        # response = await self.client.audio.speech.create(
-        #     model="tts-1",
-        #     voice="alloy",
-        #     input=text
-        # )
-        # return response.read()
+    @staticmethod
+    def cache_key(text: str) -> str:
+        return f"audio_{hashlib.sha256(text.encode()).hexdigest()}"
+
+    async def warmup(self):
+        """Connect to the TTS provider ahead of the first synthesis request."""
+        await self.http_client.warmup(self.base_url)
+
+    async def stream_cached_text_to_speech(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Audio for `text` in chunks as they arrive from the provider's streaming
+        endpoint, or in one chunk from the `audio_<sha256>` cache. The audio is
+        cached only once the whole body has been read.
+        """
+        # Not an active span: the consumer runs between chunks
+        tracer = get_tracer()
+        tts_span = tracer.start_span("tts", chars=len(text), stream=True)
+        error = None
+        try:
+            cache_key = self.cache_key(text)
+            logger.debug("Getting cached audio response", key=cache_key)
+            audio_response = cache.get(cache_key)
+            tts_span.set(cache_hit=bool(audio_response))
+            tts_cache_lookups.inc(result="hit" if audio_response else "miss")
+            if audio_response:
+                tts_span.set(audio_bytes=len(audio_response))
+                yield audio_response
+                return
+
+            parts = []
+            start = time.perf_counter()
+            async for chunk in self.stream_text_to_speech(text):
+                if not parts:
+                    tts_first_chunk_seconds.observe(time.perf_counter() - start)
+                parts.append(chunk)
+                yield chunk
+            tts_request_seconds.observe(time.perf_counter() - start)
+            audio_response = b"".join(parts)
+            logger.debug("Setting cached audio response", key=cache_key, bytes=len(audio_response))
+            cache.set(cache_key, audio_response, timeout=settings.AUDIO_CACHE_TIMEOUT)
+            tts_span.set(audio_bytes=len(audio_response), chunks=len(parts))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tracer.end_span(tts_span, error)
+
+    def _elevenlabs_request(self, text: str) -> tuple[dict, dict]:
         headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
@@ -32,22 +89,44 @@ class AudioService:
                 "style": 0.0
             }
         }
+        return headers, data
 
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: requests.post(
-                f"{self.base_url}/text-to-speech/C2RGMrNBTZaNfddRPeRH",
+    async def text_to_speech(self, text: str) -> bytes:
+        # response = await self.client.audio.speech.create(
+        #     model="tts-1",
+        #     voice="alloy",
+        #     input=text
+        # )
+        # return response.read()
+        headers, data = self._elevenlabs_request(text)
+        with tts_request_seconds.time():
+            response = await self.http_client.request(
+                "POST",
+                f"{self.base_url}/text-to-speech/{self.voice_id}",
                 headers=headers,
-                json=data
+                json=data,
             )
-        )
         
         if response.status_code == 200:
             return response.content
         else:
             raise Exception(f"ElevenLabs API error: {response.text}")
 
+    async def stream_text_to_speech(self, text: str) -> AsyncIterator[bytes]:
+        """Yield MP3 bytes from ElevenLabs' streaming endpoint as they arrive."""
+        headers, data = self._elevenlabs_request(text)
+        async with self.http_client.stream(
+            "POST",
+            f"{self.base_url}/text-to-speech/{self.voice_id}/stream",
+            headers=headers,
+            json=data,
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"ElevenLabs API error: {response.text}")
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
     async def text_to_speech_sarvam(self, text: str, target_language_code: str = "hi-IN") -> bytes:
         headers = {
             "Content-Type": "application/json",
@@ -68,14 +147,11 @@ class AudioService:
             "override_triplets": {}
         }
 
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: requests.post(
-                "https://api.sarvam.ai/text-to-speech",
-                headers=headers,
-                json=data
-            )
+        response = await self.http_client.request(
+            "POST",
+            "https://api.sarvam.ai/text-to-speech",
+            headers=headers,
+            json=data,
         )
         
         if response.status_code == 200:
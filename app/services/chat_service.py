@@ -1,5 +1,10 @@
+from typing import Dict, Optional
+
+from app.core import settings
+from app.services.history_manager import get_history_manager
 from app.services.llm_factory import LLMFactory, LLMProvider
 from ..dto.chat import ChatMessage
+from ..dto.session import SessionDTO
 from langchain.schema import HumanMessage, SystemMessage, BaseMessage, AIMessage
 
 class ChatService:
@@ -7,6 +12,7 @@ class ChatService:
         self.llm = LLMFactory.get_chat_llm(
             llm_provider=LLMProvider.OPENAI,
             model_name="gpt-4o",
+            name="chat_service",
         )
 
     async def get_chat_response(self, message: str, chat_history: list[ChatMessage]) -> str:
@@ -22,6 +28,30 @@ class ChatService:
         
         return assistant_message 
     
+    def history_messages(self, session_dto: SessionDTO, budget: int = settings.HISTORY_TOKEN_BUDGET) -> list[BaseMessage]:
+        """Conversation summary plus the most recent turns that fit in `budget` tokens."""
+        return get_history_manager().messages(session_dto, budget)
+
+    def build_messages(
+        self,
+        system_prompt: str,
+        session_dto: SessionDTO,
+        message: str,
+        budget: int = settings.HISTORY_TOKEN_BUDGET,
+        context: Optional[Dict[str, str]] = None,
+    ) -> list[BaseMessage]:
+        """
+        Prompt messages ordered from least to most volatile so providers can reuse the cached prefix:
+        the static system prompt, the conversation history, then per-turn `context` (such as the
+        current time) and the user's message.
+        """
+        messages = [SystemMessage(content=system_prompt)]
+        messages.extend(self.history_messages(session_dto, budget))
+        if context:
+            messages.append(SystemMessage(content="\n".join(f"{key}: {value}" for key, value in context.items())))
+        messages.append(HumanMessage(content=message))
+        return messages
+
     def create_messages(self, chat_history: list[ChatMessage], count: int = None) -> list[BaseMessage]:
         messages = []
         if count:
@@ -0,0 +1,162 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from langchain_core.embeddings import Embeddings
+
+from app.core import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import counter
+
+embedding_cache_hits = counter("embedding_cache_hits_total", "Query embedding cache hits by tier")
+embedding_cache_misses = counter("embedding_cache_misses_total", "Query embedding cache misses")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of query embeddings: an in-process LRU of float32 arrays in
+    front of Redis, which stores the raw float32 bytes (4 bytes per dimension).
+
+    Keys cover the model and the query with case and whitespace normalized.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        ttl: int = settings.EMBEDDING_CACHE_TTL,
+        local_max_entries: int = settings.EMBEDDING_CACHE_LOCAL_MAX_ENTRIES,
+    ):
+        self.model = model
+        self.ttl = ttl
+        self.local = LRUCache(local_max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model}\0{normalize_query(text)}".encode()).hexdigest()
+        return f"embedding_{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = self._get_local(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            found.update(self._decode(cache.get_many(missing)))
+        self._count(keys, found)
+        return found
+
+    async def aget_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = self._get_local(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            # Cache calls are thread-safe; don't queue them behind ORM work on the shared sync thread
+            stored = await sync_to_async(cache.get_many, thread_sensitive=False)(missing)
+            found.update(self._decode(stored))
+        self._count(keys, found)
+        return found
+
+    def set_many(self, vectors: Dict[str, np.ndarray]):
+        cache.set_many(self._encode(vectors), timeout=self.ttl)
+
+    async def aset_many(self, vectors: Dict[str, np.ndarray]):
+        await sync_to_async(cache.set_many, thread_sensitive=False)(self._encode(vectors), timeout=self.ttl)
+
+    def _get_local(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        for key in keys:
+            vector = self.local.get(key)
+            if vector is not None:
+                found[key] = vector
+        embedding_cache_hits.inc(len(found), tier="local")
+        return found
+
+    def _decode(self, stored: Dict[str, bytes]) -> Dict[str, np.ndarray]:
+        vectors = {key: np.frombuffer(data, dtype=np.float32) for key, data in stored.items()}
+        for key, vector in vectors.items():
+            self.local.set(key, vector, self.ttl)
+        embedding_cache_hits.inc(len(vectors), tier="redis")
+        return vectors
+
+    def _encode(self, vectors: Dict[str, np.ndarray]) -> Dict[str, bytes]:
+        for key, vector in vectors.items():
+            self.local.set(key, vector, self.ttl)
+        return {key: vector.tobytes() for key, vector in vectors.items()}
+
+    @staticmethod
+    def _count(keys: List[str], found: Dict[str, np.ndarray]):
+        embedding_cache_misses.inc(len(set(keys) - found.keys()))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings with cached queries.
+
+    `embed_query` and `embed_queries` (several queries in one request) go
+    through the cache, so repeated queries skip the embedding API. Documents
+    are embedded as before and not cached.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, embedding_cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = embedding_cache or EmbeddingCache(model)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_queries([text]))[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache.enabled:
+            return self.embeddings.embed_documents(texts)
+        keys = [self.cache.key(text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = self._missing(texts, keys, found)
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            computed = self._to_vectors(missing, embedded)
+            self.cache.set_many(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache.enabled:
+            return await self.embeddings.aembed_documents(texts)
+        keys = [self.cache.key(text) for text in texts]
+        found = await self.cache.aget_many(keys)
+        missing = self._missing(texts, keys, found)
+        if missing:
+            embedded = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = self._to_vectors(missing, embedded)
+            await self.cache.aset_many(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    @staticmethod
+    def _missing(texts: List[str], keys: List[str], found: Dict[str, np.ndarray]) -> Dict[str, str]:
+        """{key: text} of the uncached queries, one text per key."""
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return missing
+
+    @staticmethod
+    def _to_vectors(missing: Dict[str, str], embedded: List[List[float]]) -> Dict[str, np.ndarray]:
+        return {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, embedded)}
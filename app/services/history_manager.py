@@ -0,0 +1,158 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from app.core import settings
+from app.dto.session import SessionDTO
+from app.services.llm_factory import LLMFactory, LLMProvider
+from app.services.lru_cache import LRUCache
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+summary_prompt = """
+You maintain a running summary of a conversation between Vaani, a voice assistant for the elderly, and its user.
+Update the current summary with the new turns. Keep names, health details, preferences, open requests and
+anything the user asked to be remembered. Drop small talk. Write at most 150 words in the third person.
+"""
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the gpt-4o tokenizer, or roughly 4 characters per token if it can't be loaded."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning("Tokenizer unavailable, estimating token counts", error=str(e))
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+@dataclass
+class RenderedHistory:
+    """Messages after the summarized prefix, converted once and extended as turns are added."""
+    summarized_turns: int
+    summary_message: Optional[SystemMessage]
+    summary_tokens: int
+    messages: List[BaseMessage] = field(default_factory=list)
+    tokens: List[int] = field(default_factory=list)
+
+
+class HistoryManager:
+    """
+    Bounded chat history for prompts.
+
+    Older turns are folded into `SessionDTO.summary` in the background once the
+    unsummarized history exceeds `summarize_after_tokens`; the latest
+    `keep_recent` messages always stay verbatim. Each call site asks for the
+    summary plus the recent messages that fit its token budget, dropping the
+    oldest ones `keep_recent` at a time.
+    """
+
+    # Per-message overhead of the chat format
+    MESSAGE_OVERHEAD_TOKENS = 4
+
+    def __init__(
+        self,
+        summarize_after_tokens: int = settings.HISTORY_SUMMARIZE_AFTER_TOKENS,
+        keep_recent: int = settings.HISTORY_KEEP_RECENT_MESSAGES,
+    ):
+        self.summarize_after_tokens = summarize_after_tokens
+        self.keep_recent = keep_recent
+        self.llm = LLMFactory.get_chat_llm(
+            llm_provider=LLMProvider.OPENAI,
+            model_name="gpt-4o-mini",
+            max_tokens=300,
+            cache_ttl=0,
+            name="history_summary",
+        )
+        self._rendered = LRUCache(settings.SESSION_MAX_LIVE)
+        self._summarizing: Dict[str, asyncio.Task] = {}
+
+    def messages(self, session_dto: SessionDTO, budget: int = settings.HISTORY_TOKEN_BUDGET) -> List[BaseMessage]:
+        rendered = self._render(session_dto)
+        total = rendered.summary_tokens
+        start = len(rendered.messages)
+        while start > 0 and total + rendered.tokens[start - 1] <= budget:
+            start -= 1
+            total += rendered.tokens[start]
+        # The window start moves in blocks of `keep_recent` messages from the summary boundary,
+        # so consecutive prompts share a byte-identical prefix until the next block is dropped
+        block = max(1, self.keep_recent)
+        aligned = -(-start // block) * block
+        if aligned < len(rendered.messages):
+            start = aligned
+        prefix = [rendered.summary_message] if rendered.summary_message else []
+        return prefix + rendered.messages[start:]
+
+    def _render(self, session_dto: SessionDTO) -> RenderedHistory:
+        rendered: Optional[RenderedHistory] = self._rendered.get(session_dto.id)
+        history = session_dto.chat_history
+        if (
+            rendered is None
+            or rendered.summarized_turns != session_dto.summarized_turns
+            or rendered.summarized_turns + len(rendered.messages) > len(history)
+        ):
+            summary_message = None
+            summary_tokens = 0
+            if session_dto.summary:
+                summary_message = SystemMessage(content=f"Summary of the earlier conversation:\n{session_dto.summary}")
+                summary_tokens = count_tokens(summary_message.content) + self.MESSAGE_OVERHEAD_TOKENS
+            rendered = RenderedHistory(session_dto.summarized_turns, summary_message, summary_tokens)
+            self._rendered.set(session_dto.id, rendered)
+        for message in history[rendered.summarized_turns + len(rendered.messages):]:
+            message_cls = HumanMessage if message.role == "user" else AIMessage
+            rendered.messages.append(message_cls(content=message.content))
+            rendered.tokens.append(count_tokens(message.content) + self.MESSAGE_OVERHEAD_TOKENS)
+        return rendered
+
+    def maybe_summarize(self, session_dto: SessionDTO):
+        """Start a background summary update if the unsummarized history has grown past the threshold."""
+        task = self._summarizing.get(session_dto.id)
+        if task and not task.done():
+            return
+        rendered = self._render(session_dto)
+        if len(rendered.messages) <= self.keep_recent or sum(rendered.tokens) <= self.summarize_after_tokens:
+            return
+        task = asyncio.create_task(self.summarize(session_dto))
+        self._summarizing[session_dto.id] = task
+        task.add_done_callback(lambda _: self._summarizing.pop(session_dto.id, None))
+
+    async def summarize(self, session_dto: SessionDTO):
+        start = session_dto.summarized_turns
+        end = len(session_dto.chat_history) - self.keep_recent
+        if end <= start:
+            return
+        turns = "\n".join(f"{message.role}: {message.content}" for message in session_dto.chat_history[start:end])
+        messages = [
+            SystemMessage(content=summary_prompt),
+            HumanMessage(content=f"Current summary:\n{session_dto.summary or 'None'}\n\nNew turns:\n{turns}"),
+        ]
+        try:
+            response = await self.llm.ainvoke(messages)
+        except Exception as e:
+            logger.error("Failed to summarize chat history", session_id=session_dto.id, error=str(e))
+            return
+        if session_dto.summarized_turns != start:
+            return
+        session_dto.summary = response.content
+        session_dto.summarized_turns = end
+        logger.info("Summarized chat history", session_id=session_dto.id, summarized_turns=end)
+
+
+_history_manager: Optional[HistoryManager] = None
+
+
+def get_history_manager() -> HistoryManager:
+    global _history_manager
+    if _history_manager is None:
+        _history_manager = HistoryManager()
+    return _history_manager
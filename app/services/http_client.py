@@ -0,0 +1,153 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from app.core import settings
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """
+    Process-wide async HTTP client.
+
+    Wraps one long-lived httpx.AsyncClient so outbound calls reuse keep-alive
+    connections instead of paying a TCP+TLS handshake per request. Requests are
+    capped per host, time out, and are retried with exponential backoff on
+    transport errors and retryable status codes.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        per_host_limit: int = settings.HTTP_PER_HOST_LIMIT,
+        timeout: float = settings.HTTP_TIMEOUT,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        max_retries: int = settings.HTTP_MAX_RETRIES,
+        retry_backoff: float = settings.HTTP_RETRY_BACKOFF,
+        max_retry_delay: float = settings.HTTP_MAX_RETRY_DELAY,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_delay = max_retry_delay
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # When a connection to each host was last used, to skip warmups while it is still kept alive
+        self._last_used: Dict[str, float] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the server's Retry-After is above `max_retry_delay`."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= self.max_retry_delay else None
+        return min(self.retry_backoff * (2 ** attempt) * (0.5 + random.random()), self.max_retry_delay)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and read the whole body, retrying transient failures."""
+        async with self.stream(method, url, **kwargs) as response:
+            await response.aread()
+            return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Send a request and yield the response before its body is read,
+        so callers can forward bytes as they arrive.
+
+        Retries happen only until a response is yielded. The host's slot is
+        held while a request is in flight and its response is open, not while
+        waiting to retry. A retryable response whose Retry-After is longer than
+        `max_retry_delay` is returned as is instead of waited for.
+        """
+        semaphore = self._host_semaphore(url)
+        attempt = 0
+        while True:
+            request = self.client.build_request(method, url, **kwargs)
+            await semaphore.acquire()
+            try:
+                response = await self.client.send(request, stream=True)
+            except BaseException as e:
+                semaphore.release()
+                if not isinstance(e, httpx.TransportError) or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("HTTP request failed, retrying", url=url, error=str(e), attempt=attempt + 1, delay=delay)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    break
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    logger.warning("HTTP Retry-After too long, not retrying", url=url, status_code=response.status_code,
+                                   retry_after=response.headers.get("Retry-After"))
+                    break
+                try:
+                    await response.aclose()
+                finally:
+                    semaphore.release()
+                logger.warning("HTTP request returned retryable status", url=url, status_code=response.status_code, attempt=attempt + 1, delay=delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+        try:
+            yield response
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                semaphore.release()
+            self._last_used[request.url.host] = time.monotonic()
+
+    async def warmup(self, url: str):
+        """
+        Open a keep-alive connection to the host of `url` ahead of a request,
+        so the request doesn't wait for the TCP+TLS handshake.
+        Skipped while a recently used connection is still alive; failures are ignored.
+        """
+        host = httpx.URL(url).host
+        if time.monotonic() - self._last_used.get(host, float("-inf")) < self.limits.keepalive_expiry / 2:
+            return
+        self._last_used[host] = time.monotonic()
+        try:
+            response = await self.client.request("HEAD", url)
+            await response.aclose()
+        except httpx.HTTPError as e:
+            logger.debug("HTTP warmup failed", url=url, error=str(e))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_http_client: Optional[HTTPClient] = None
+
+
+def get_http_client() -> HTTPClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = HTTPClient()
+    return _http_client
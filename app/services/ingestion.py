@@ -0,0 +1,132 @@
+"""
+Streaming bulk ingestion into `data_embeddings`.
+
+Documents are read lazily from any iterable in chunks of `batch_size`. Up to
+`max_concurrency` chunks are embedded at once, and each chunk is written with
+one `bulk_create` in its own transaction, in input order. Memory and
+transaction length are bounded by the chunk size instead of the corpus size.
+
+With a `job_id`, the number of documents written is checkpointed in
+`ingestion_jobs` in the same transaction as each chunk, so a rerun of the
+job with the same input skips exactly what was already written. Rows get the
+pipeline's `source` and `current_version`, which `PGVector.upsert_texts`
+matches on when the source is ingested again.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from langchain_core.documents import Document as LangChainDocument
+
+from app.core import settings
+from app.dto.ingestion import IngestionResult
+from app.models.models import DataEmbedding, IngestionJob
+from app.services.metrics import counter, histogram
+from app.services.vector_store import PGVector
+
+logger = structlog.get_logger(__name__)
+
+ingested_documents = counter("ingested_documents_total", "Documents written by the bulk ingestion pipeline")
+ingest_chunk_seconds = histogram("ingest_chunk_seconds", "Bulk ingestion time per chunk by stage (embed, write)")
+
+Chunk = List[LangChainDocument]
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        store: PGVector,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        max_concurrency: int = settings.INGEST_MAX_CONCURRENCY,
+        source: Optional[str] = None,
+        current_version: Optional[str] = None,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        # Recorded on every row, so sources ingested here can later be upserted
+        self.source = source
+        self.current_version = current_version
+
+    async def ingest(self, documents: Iterable[LangChainDocument], job_id: Optional[str] = None) -> IngestionResult:
+        """
+        Embed and store `documents`.
+
+        With `job_id`, resumes after the documents written by earlier runs of
+        the job; the input must yield the same documents in the same order.
+        """
+        start = time.perf_counter()
+        resumed_from = await sync_to_async(self._progress)(job_id) if job_id else 0
+        if resumed_from:
+            logger.info("Resuming ingestion", job_id=job_id, documents_done=resumed_from)
+
+        done = resumed_from
+        chunks = 0
+        pending: Deque[Tuple[Chunk, asyncio.Task]] = deque()
+        try:
+            for chunk in self._chunks(itertools.islice(documents, resumed_from, None)):
+                pending.append((chunk, asyncio.create_task(self._embed(chunk))))
+                # The oldest chunk is written while the newer ones are still being embedded
+                if len(pending) >= self.max_concurrency:
+                    done = await self._write_next(pending, job_id, done)
+                    chunks += 1
+            while pending:
+                done = await self._write_next(pending, job_id, done)
+                chunks += 1
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+        result = IngestionResult(
+            job_id=job_id,
+            documents=done - resumed_from,
+            chunks=chunks,
+            seconds=time.perf_counter() - start,
+            resumed_from=resumed_from,
+        )
+        logger.info(
+            "Ingestion finished", job_id=job_id, documents=result.documents, chunks=chunks,
+            seconds=round(result.seconds, 2), docs_per_second=round(result.docs_per_second, 1),
+        )
+        return result
+
+    def _chunks(self, documents: Iterable[LangChainDocument]) -> Iterator[Chunk]:
+        iterator = iter(documents)
+        while chunk := list(itertools.islice(iterator, self.batch_size)):
+            yield chunk
+
+    async def _embed(self, chunk: Chunk) -> List[List[float]]:
+        with ingest_chunk_seconds.time(stage="embed"):
+            return await self.store.embeddings.aembed_documents([document.page_content for document in chunk])
+
+    async def _write_next(self, pending: Deque[Tuple[Chunk, asyncio.Task]], job_id: Optional[str], done: int) -> int:
+        chunk, task = pending.popleft()
+        embeddings = await task
+        with ingest_chunk_seconds.time(stage="write"):
+            await sync_to_async(self._write)(chunk, embeddings, job_id, done + len(chunk))
+        ingested_documents.inc(len(chunk))
+        logger.debug("Ingested chunk", job_id=job_id, documents=len(chunk), documents_done=done + len(chunk))
+        return done + len(chunk)
+
+    def _write(self, chunk: Chunk, embeddings: List[List[float]], job_id: Optional[str], documents_done: int):
+        rows = self.store.build_data_embeddings(
+            [document.page_content for document in chunk],
+            embeddings,
+            [dict(document.metadata) for document in chunk],
+            source=self.source,
+            version=self.current_version,
+        )
+        with transaction.atomic():
+            DataEmbedding.objects.bulk_create(rows)
+            if job_id:
+                IngestionJob.objects.update_or_create(job_id=job_id, defaults={"documents_done": documents_done})
+
+    @staticmethod
+    def _progress(job_id: str) -> int:
+        job = IngestionJob.objects.filter(job_id=job_id).first()
+        return job.documents_done if job else 0
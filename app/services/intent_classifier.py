@@ -0,0 +1,199 @@
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core import settings
+from app.dto.planner import IntentPrediction
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+_TIME = r"(at |by |in the )?(\d{1,2}\b|morning|afternoon|evening|night|noon)"
+_FOOD = (
+    r"(food|pizzas?|burgers?|biryani|dosas?|idlis?|samosas?|lunch|dinner|breakfast|meals?|snacks?|groceries"
+    r"|vegetables|fruits?|milk|bread|tea|coffee|sweets?)"
+)
+_QUANTITY = r"(\d+|one|two|three|four|five|half|plates?|packets?|kgs?|kilos?|dozen|litres?)"
+
+# Keyword heuristics from the planner prompt, in priority order.
+# A "dominant" rule wins even when other rules also match (e.g. "remind me to take my medicine").
+# Ambiguous words ("in order to", "Tom Hanks", "medicine schedule") only count with context;
+# on their own they match the weak rules at the end, which stay below the threshold.
+INTENT_RULES: List[Tuple[str, re.Pattern, float, bool]] = [
+    ("Scheduler", re.compile(rf"\b(remind(er)?s?|tomorrow|alarm)\b|\btom {_TIME}|\bschedule (a|an|my|the|it|this|for)\b"), 0.95, True),
+    ("Entertainment", re.compile(r"\b(play|watch|put on)\b.*\b(movie|film|show|song|music|video|serial)s?\b"), 0.95, False),
+    ("Communication", re.compile(r"\b(call|ring|message|text|whatsapp)\b.*\b(son|daughter|rahul|rohit|nephew|family)\b|\bsend (a |the )?message\b"), 0.95, False),
+    ("News", re.compile(r"\b(news|headlines?|traffic)\b"), 0.92, False),
+    ("Order", re.compile(rf"\b(swiggy|zomato)\b|(?<!in )\border\b(\W+\w+){{0,3}}?\W+({_FOOD}|{_QUANTITY})\b"), 0.92, False),
+    ("Health", re.compile(r"\b(medicines?|tablets?|pills?|exercises?|excercises?|blood pressure|sugar test)\b"), 0.92, False),
+    ("Scheduler", re.compile(r"\b(tom|schedule)\b"), 0.6, False),
+    ("Order", re.compile(r"\border\b"), 0.6, False),
+]
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def features(query: str, previous_state: Optional[str] = None) -> List[str]:
+    """Word unigrams and bigrams, plus the previous planner state (context for follow-ups)."""
+    tokens = tokenize(query)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if previous_state:
+        grams.append(f"__prev__{previous_state}")
+    return grams
+
+
+def classify_by_rules(query: str) -> Optional[IntentPrediction]:
+    text = query.lower()
+    matches = [(label, confidence, dominant) for label, pattern, confidence, dominant in INTENT_RULES if pattern.search(text)]
+    if not matches:
+        return None
+    label, confidence, dominant = matches[0]
+    if len({m[0] for m in matches}) > 1 and not dominant:
+        # Conflicting keywords: not confident enough to skip the planner
+        confidence /= 2
+    return IntentPrediction(label=label, confidence=confidence, source="rule")
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over n-gram features, trained from logged planner decisions."""
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.label_counts: Dict[str, int] = {}
+        self.feature_counts: Dict[str, Dict[str, int]] = {}
+        self.vocabulary: set = set()
+
+    def fit(self, examples: Iterable[dict]) -> "NaiveBayesIntentModel":
+        label_counts = Counter()
+        feature_counts = defaultdict(Counter)
+        for example in examples:
+            label = example["label"]
+            label_counts[label] += 1
+            feature_counts[label].update(features(example["query"], example.get("previous_state")))
+        self.label_counts = dict(label_counts)
+        self.feature_counts = {label: dict(counts) for label, counts in feature_counts.items()}
+        self.vocabulary = {f for counts in self.feature_counts.values() for f in counts}
+        return self
+
+    def predict_proba(self, query: str, previous_state: Optional[str] = None) -> Dict[str, float]:
+        if not self.label_counts:
+            return {}
+        grams = [g for g in features(query, previous_state) if g in self.vocabulary]
+        total = sum(self.label_counts.values())
+        vocabulary_size = len(self.vocabulary)
+        log_scores = {}
+        for label, count in self.label_counts.items():
+            counts = self.feature_counts.get(label, {})
+            denominator = sum(counts.values()) + self.alpha * vocabulary_size
+            log_scores[label] = math.log(count / total) + sum(
+                math.log((counts.get(g, 0) + self.alpha) / denominator) for g in grams
+            )
+        best = max(log_scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: score / norm for label, score in exp_scores.items()}
+
+    def predict(self, query: str, previous_state: Optional[str] = None) -> Optional[IntentPrediction]:
+        # Without any known word of the query, the prior and the previous state alone would
+        # pick the label, confidently enough to skip the planner
+        if not any(g in self.vocabulary for g in features(query)):
+            return None
+        probabilities = self.predict_proba(query, previous_state)
+        if not probabilities:
+            return None
+        label = max(probabilities, key=probabilities.get)
+        return IntentPrediction(label=label, confidence=probabilities[label], source="model")
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"alpha": self.alpha, "label_counts": self.label_counts, "feature_counts": self.feature_counts}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesIntentModel":
+        with open(path) as f:
+            data = json.load(f)
+        model = cls(alpha=data["alpha"])
+        model.label_counts = data["label_counts"]
+        model.feature_counts = data["feature_counts"]
+        model.vocabulary = {f for counts in model.feature_counts.values() for f in counts}
+        return model
+
+
+class IntentClassifier:
+    """
+    Local fast path in front of the LLM planner.
+    Answers only when a rule or the trained model is at least `threshold` confident.
+    """
+
+    def __init__(self, model: Optional[NaiveBayesIntentModel] = None, threshold: float = settings.INTENT_CONFIDENCE_THRESHOLD):
+        self.model = model
+        self.threshold = threshold
+
+    def classify(self, query: str, previous_state: Optional[str] = None) -> Optional[IntentPrediction]:
+        prediction = classify_by_rules(query)
+        if (prediction is None or prediction.confidence < self.threshold) and self.model:
+            prediction = self.model.predict(query, previous_state)
+        if prediction and prediction.confidence >= self.threshold:
+            return prediction
+        return None
+
+
+class PlannerDecisionLog:
+    """
+    Appends LLM planner decisions as JSONL training data for the intent model.
+    Lines are written in order by one background thread, off the event loop.
+    """
+
+    _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner-decision-log")
+
+    def __init__(self, path: str = settings.PLANNER_DECISION_LOG):
+        self.path = path
+
+    def record(self, query: str, previous_state: Optional[str], label: str, latency_ms: float):
+        if not self.path:
+            return
+        line = json.dumps({
+            "query": query,
+            "previous_state": previous_state,
+            "label": label,
+            "latency_ms": round(latency_ms, 1),
+            "ts": time.time(),
+        }) + "\n"
+        self._writer.submit(self._append, line)
+
+    def _append(self, line: str):
+        try:
+            with open(self.path, "a") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning("Failed to log planner decision", error=str(e))
+
+
+def read_decision_log(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+_intent_classifier: Optional[IntentClassifier] = None
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """Process-wide classifier, loading the trained model once if it exists."""
+    global _intent_classifier
+    if _intent_classifier is None:
+        model = None
+        if os.path.exists(settings.INTENT_MODEL_PATH):
+            model = NaiveBayesIntentModel.load(settings.INTENT_MODEL_PATH)
+            logger.info("Loaded intent model", path=settings.INTENT_MODEL_PATH, labels=list(model.label_counts))
+        _intent_classifier = IntentClassifier(model)
+    return _intent_classifier
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Any, List, Optional, Type
+
+from django.core.cache import cache
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+from app.core import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import counter
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+llm_cache_hits = counter("llm_cache_hits_total", "LLM response cache hits by tier")
+llm_cache_misses = counter("llm_cache_misses_total", "LLM response cache misses")
+
+ISO_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:\d{2})?"
+)
+
+# Shared in-process tier in front of Redis
+_local_cache = LRUCache(settings.LLM_CACHE_LOCAL_MAX_ENTRIES)
+
+
+def normalize_timestamps(text: str, granularity: int) -> str:
+    """Floor ISO timestamps embedded in prompts to `granularity` seconds so they stop busting the cache."""
+    def floor(match: re.Match) -> str:
+        try:
+            timestamp = datetime.fromisoformat(match.group(0).replace("Z", "+00:00"))
+        except ValueError:
+            return match.group(0)
+        seconds = int(timestamp.timestamp())
+        return datetime.fromtimestamp(seconds - seconds % granularity, timestamp.tzinfo).isoformat()
+    if granularity <= 0:
+        return text
+    return ISO_TIMESTAMP.sub(floor, text)
+
+
+def schema_fingerprint(structured_cls: Optional[Type[BaseModel]]) -> Optional[str]:
+    if structured_cls is None:
+        return None
+    schema = json.dumps(structured_cls.model_json_schema(), sort_keys=True)
+    return f"{structured_cls.__module__}.{structured_cls.__qualname__}:{hashlib.sha256(schema.encode()).hexdigest()[:16]}"
+
+
+class LLMCache:
+    """
+    Two-tier LLM response cache: an in-process LRU in front of Redis.
+
+    Keys cover the model and its sampling parameters, the structured output
+    schema and the role-tagged messages, with embedded ISO timestamps floored
+    to `timestamp_granularity` seconds.
+    """
+
+    def __init__(self, ttl: int = settings.LLM_CACHE_TTL, timestamp_granularity: int = settings.LLM_CACHE_TIMESTAMP_GRANULARITY):
+        self.ttl = ttl
+        self.timestamp_granularity = timestamp_granularity
+        self.local = _local_cache
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def key(self, model: dict, structured_cls: Optional[Type[BaseModel]], messages: List[BaseMessage]) -> str:
+        payload = {
+            "model": model,
+            "schema": schema_fingerprint(structured_cls),
+            "messages": [[message.type, self._content(message)] for message in messages],
+        }
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        return f"llm_{digest}"
+
+    def _content(self, message: BaseMessage) -> str:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        return normalize_timestamps(content, self.timestamp_granularity)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            llm_cache_hits.inc(tier="local")
+            return value
+        value = cache.get(key)
+        if value is not None:
+            llm_cache_hits.inc(tier="redis")
+            self.local.set(key, value, self.ttl)
+            return value
+        llm_cache_misses.inc()
+        return None
+
+    def set(self, key: str, value: Any):
+        self.local.set(key, value, self.ttl)
+        cache.set(key, value, timeout=self.ttl)
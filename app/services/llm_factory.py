@@ -1,18 +1,31 @@
-import hashlib
-from typing import List, Union
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import httpx
 from django.db import models
 from pydantic import BaseModel
 from app.core import settings
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages.ai import add_usage
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
-from django.core.cache import cache
+from app.services.llm_cache import LLMCache
+from app.services.metrics import counter, histogram
+from app.services.tracing import current_span, get_tracer, span
 import structlog    
 
 logger = structlog.get_logger(__name__)
 
+llm_requests = counter("llm_requests_total", "Provider calls (cache misses) by call site and model")
+llm_request_seconds = counter("llm_request_seconds_total", "Seconds spent in provider calls by call site and model")
+llm_prompt_tokens = counter("llm_prompt_tokens_total", "Prompt tokens sent by call site and model")
+llm_cached_prompt_tokens = counter("llm_cached_prompt_tokens_total", "Prompt tokens served from the provider's prompt cache")
+llm_completion_tokens = counter("llm_completion_tokens_total", "Completion tokens generated by call site and model")
+llm_request_duration = histogram("llm_request_duration_seconds", "Provider call latency by call site and model")
+llm_cache_lookups = counter("llm_cache_lookups_total", "LLM response cache lookups by call site and result (hit, miss)")
+
 
 class LLMProvider(models.TextChoices):
     OPENAI = "openai"
@@ -20,6 +33,17 @@ class LLMProvider(models.TextChoices):
 
 
 class LLMFactory:
+    """
+    Builds LLM wrappers on top of process-wide chat model clients.
+
+    Chat models are shared across sessions, keyed by provider, model and
+    parameters, so per-connection actor construction no longer creates new
+    provider clients. OpenAI models also share one pooled httpx client.
+    """
+    _chat_models: Dict[Tuple, BaseChatModel] = {}
+    _structured_models: Dict[Tuple, Any] = {}
+    _http_async_client: Optional[httpx.AsyncClient] = None
+
     @staticmethod
     def get_chat_llm(
         llm_provider: LLMProvider,
@@ -30,9 +54,38 @@ class LLMFactory:
         streaming=True,
         timeout=None,
         structured_cls: BaseModel = None,
+        cache_ttl: int = settings.LLM_CACHE_TTL,
+        cache_timestamp_granularity: int = settings.LLM_CACHE_TIMESTAMP_GRANULARITY,
+        name: str = None,
     ):
+        """
+        Args:
+            cache_ttl: Seconds to cache responses for this call site, 0 disables caching
+            cache_timestamp_granularity: Seconds that prompt timestamps are floored to in cache keys
+            name: Call site label for the request and token metrics, defaults to the structured class or model name
+        """
+        key = (llm_provider, model_name, temperature, max_retries, max_tokens, streaming, timeout)
+        chat_model = LLMFactory._chat_models.get(key)
+        if chat_model is None:
+            chat_model = LLMFactory._create_chat_model(*key)
+            LLMFactory._chat_models[key] = chat_model
+            logger.info("Created shared chat model", provider=llm_provider, model=model_name)
+        structured_model = None
+        if structured_cls:
+            structured_key = (key, structured_cls)
+            structured_model = LLMFactory._structured_models.get(structured_key)
+            if structured_model is None:
+                # The raw message carries the token usage that the parsed object drops
+                structured_model = chat_model.with_structured_output(structured_cls, include_raw=True)
+                LLMFactory._structured_models[structured_key] = structured_model
+        llm_cache = LLMCache(ttl=cache_ttl, timestamp_granularity=cache_timestamp_granularity)
+        name = name or (structured_cls.__name__ if structured_cls else model_name)
+        return LLM(chat_model, structured_cls, llm_cache, structured_model, name=name)
+
+    @staticmethod
+    def _create_chat_model(llm_provider, model_name, temperature, max_retries, max_tokens, streaming, timeout) -> BaseChatModel:
         if llm_provider == LLMProvider.OPENAI:
-            return LLM(ChatOpenAI(
+            return ChatOpenAI(
                 api_key=settings.OPENAI_API_KEY,
                 model=model_name,
                 temperature=temperature,
@@ -40,9 +93,12 @@ class LLMFactory:
                 max_tokens=max_tokens,
                 streaming=streaming,
                 timeout=timeout,
-            ), structured_cls)
+                # Report token usage, including cached prompt tokens, on streamed responses too
+                stream_usage=True,
+                http_async_client=LLMFactory._get_http_async_client(),
+            )
         elif llm_provider == LLMProvider.ANTHROPIC:
-            return LLM(ChatAnthropic(
+            return ChatAnthropic(
                 api_key=settings.ANTHROPIC_API_KEY,
                 model=model_name,
                 temperature=temperature,
@@ -50,7 +106,30 @@ class LLMFactory:
                 max_tokens=max_tokens,
                 streaming=streaming,
                 timeout=timeout,
-            ), structured_cls)
+            )
+        raise ValueError(f"Unsupported LLM provider: {llm_provider}")
+
+    @staticmethod
+    def _get_http_async_client() -> httpx.AsyncClient:
+        if LLMFactory._http_async_client is None or LLMFactory._http_async_client.is_closed:
+            LLMFactory._http_async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                # The OpenAI SDK applies its own per-request timeout
+                timeout=None,
+            )
+        return LLMFactory._http_async_client
+
+    @staticmethod
+    async def aclose():
+        """Close the shared provider connection pool and drop cached clients."""
+        if LLMFactory._http_async_client is not None:
+            await LLMFactory._http_async_client.aclose()
+        LLMFactory._http_async_client = None
+        LLMFactory._chat_models.clear()
+        LLMFactory._structured_models.clear()
 
     @staticmethod
     def openai_to_anthropic_messages(
@@ -69,34 +148,118 @@ class LLMFactory:
         ]
     
 class LLM:
-    def __init__(self, chat_model: BaseChatModel, structured_cls: BaseModel):
+    def __init__(self, chat_model: BaseChatModel, structured_cls: BaseModel, llm_cache: LLMCache = None, structured_model=None, name: str = None):
         self.llm = chat_model
+        self.structured_cls = structured_cls
+        self.cache = llm_cache or LLMCache()
+        self.model_params = {
+            "provider": type(chat_model).__name__,
+            "model": getattr(chat_model, "model_name", None) or getattr(chat_model, "model", None),
+            "temperature": getattr(chat_model, "temperature", None),
+            "max_tokens": getattr(chat_model, "max_tokens", None),
+        }
+        self.name = name or (structured_cls.__name__ if structured_cls else self.model_params["model"])
         if structured_cls:
-            self.llm = self.llm.with_structured_output(structured_cls)
+            self.llm = structured_model or self.llm.with_structured_output(structured_cls, include_raw=True)
         
     def invoke(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]]):
-        return self.llm.invoke(messages)
+        start = time.perf_counter()
+        response = self.llm.invoke(messages)
+        return self._unwrap(response, time.perf_counter() - start)
         
     async def ainvoke(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]]):
-        cached_response = self.get_cached_response(messages)
-        if cached_response:
-            return cached_response
-        else:
-            response = await self.llm.ainvoke(messages)
-            self.set_cached_response(messages, response)
+        with span("llm", call_site=self.name, model=self.model_params["model"], messages=len(messages)) as llm_span:
+            cached_response = self.get_cached_response(messages)
+            llm_span.set(cache_hit=bool(cached_response))
+            if cached_response:
+                return cached_response
+            else:
+                start = time.perf_counter()
+                response = await self.llm.ainvoke(messages)
+                response = self._unwrap(response, time.perf_counter() - start)
+                self.set_cached_response(messages, response)
+                return response
+
+    def _unwrap(self, response, seconds: float):
+        """Record the call's usage and return the message, or the parsed object for structured output."""
+        if not self.structured_cls:
+            self.record_usage(getattr(response, "usage_metadata", None), seconds)
             return response
+        self.record_usage(getattr(response["raw"], "usage_metadata", None), seconds)
+        if response["parsing_error"]:
+            raise response["parsing_error"]
+        return response["parsed"]
+
+    def record_usage(self, usage: Optional[dict], seconds: float, llm_span=None):
+        labels = {"call_site": self.name, "model": self.model_params["model"]}
+        llm_requests.inc(**labels)
+        llm_request_seconds.inc(seconds, **labels)
+        llm_request_duration.observe(seconds, **labels)
+        if not usage:
+            return
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        llm_prompt_tokens.inc(usage.get("input_tokens", 0), **labels)
+        llm_cached_prompt_tokens.inc(cached_tokens, **labels)
+        llm_completion_tokens.inc(usage.get("output_tokens", 0), **labels)
+        (llm_span or current_span()).set(input_tokens=usage.get("input_tokens", 0), cached_tokens=cached_tokens,
+                                         output_tokens=usage.get("output_tokens", 0))
+        logger.debug("LLM usage", **labels, seconds=round(seconds, 3), input_tokens=usage.get("input_tokens"),
+                     cached_tokens=cached_tokens, output_tokens=usage.get("output_tokens"))
+
+    async def astream(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]]):
+        """
+        Stream the response text chunk by chunk.
+        The full response is cached once the stream has been consumed.
+        """
+        # Not made the active span: the consumer's own work runs between chunks
+        tracer = get_tracer()
+        llm_span = tracer.start_span("llm", call_site=self.name, model=self.model_params["model"],
+                                     messages=len(messages), stream=True)
+        error = None
+        try:
+            with tracer.use(llm_span):
+                cached_response = self.get_cached_response(messages)
+            llm_span.set(cache_hit=bool(cached_response))
+            if cached_response:
+                yield cached_response.content
+                return
+            content = []
+            usage = None
+            start = time.perf_counter()
+            async for chunk in self.llm.astream(messages):
+                if chunk.usage_metadata:
+                    usage = add_usage(usage, chunk.usage_metadata)
+                if chunk.content:
+                    if not content:
+                        llm_span.set(first_token_ms=round((time.perf_counter() - start) * 1000, 3))
+                    content.append(chunk.content)
+                    yield chunk.content
+            self.record_usage(usage, time.perf_counter() - start, llm_span)
+            self.set_cached_response(messages, AIMessage(content="".join(content)))
+        except (Exception, asyncio.CancelledError) as e:
+            error = e
+            raise
+        finally:
+            tracer.end_span(llm_span, error)
         
     def construct_message_hash(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]]):
-        msg_str = "".join([msg.content for msg in messages])
-        # logger.info("messages", messages=msg_str)
-        return hashlib.sha256(msg_str.encode()).hexdigest()
+        return self.cache.key(self.model_params, self.structured_cls, messages)
         
     def get_cached_response(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]]):
-        msg_hash = self.construct_message_hash(messages)
-        logger.info("Getting cached response", message=msg_hash)
-        return cache.get(msg_hash)
+        if not self.cache.enabled:
+            return None
+        with span("llm.cache_lookup", call_site=self.name) as lookup_span:
+            msg_hash = self.construct_message_hash(messages)
+            logger.debug("Getting cached response", call_site=self.name, key=msg_hash)
+            response = self.cache.get(msg_hash)
+            lookup_span.set(hit=response is not None)
+            llm_cache_lookups.inc(call_site=self.name, result="miss" if response is None else "hit")
+            return response
         
     def set_cached_response(self, messages: List[Union[SystemMessage, HumanMessage, AIMessage]], response: str):
-        logger.info("Setting cached response", message=response)
+        if not self.cache.enabled:
+            return
         msg_hash = self.construct_message_hash(messages)
-        cache.set(msg_hash, response, timeout=60*60*24)
+        # Rendered (and capped) on the log writer thread, only when debug logging is on
+        logger.debug("Setting cached response", call_site=self.name, key=msg_hash, response=response)
+        self.cache.set(msg_hash, response)
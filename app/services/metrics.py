@@ -0,0 +1,195 @@
+import bisect
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self._values[self._key(labels)] += amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        return dict(self._values)
+
+    @staticmethod
+    def _key(labels: dict) -> LabelKey:
+        return _label_key(labels)
+
+
+class Gauge:
+    """A value that goes up and down, either set directly or read from a function when scraped."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        self._values[_label_key(labels)] += amount
+
+    def dec(self, amount: float = 1, **labels):
+        self._values[_label_key(labels)] -= amount
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Report `function()` for these labels; it runs on every scrape and must be cheap."""
+        self._functions[_label_key(labels)] = function
+
+    def get(self, **labels) -> float:
+        key = _label_key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        samples = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                samples[key] = function()
+            except Exception:
+                samples[key] = math.nan
+        return samples
+
+
+class Histogram:
+    """Observed values counted into cumulative buckets, plus their sum and count, split by labels."""
+
+    type = "histogram"
+
+    # Seconds, from a cache hit to a slow provider call
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name: str, description: str = "", buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        # Per label set: counts per bucket (the last one is +Inf), sum
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        values = self._values.get(key)
+        if values is None:
+            values = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = values
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds the block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        values = self._values.get(_label_key(labels))
+        return sum(values[0]) if values else 0
+
+    def sum(self, **labels) -> float:
+        values = self._values.get(_label_key(labels))
+        return values[1][0] if values else 0.0
+
+    def samples(self) -> Dict[LabelKey, Tuple[List[Tuple[float, int]], float, int]]:
+        """{labels: ([(upper bound, cumulative count)], sum, count)}, with +Inf as the last bound."""
+        samples = {}
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            samples[key] = (buckets, total[0], cumulative)
+        return samples
+
+
+_registry: Dict[str, Any] = {}
+
+
+def _get_or_create(metric_cls, name: str, description: str, **kwargs):
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = metric_cls(name, description, **kwargs)
+    elif not isinstance(metric, metric_cls):
+        raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+    return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    """Get or create the process-wide counter called `name`."""
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    """Get or create the process-wide gauge called `name`."""
+    return _get_or_create(Gauge, name, description)
+
+
+def histogram(name: str, description: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+    """Get or create the process-wide histogram called `name`."""
+    return _get_or_create(Histogram, name, description, buckets=buckets)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    labels = key + extra
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(_registry):
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        if isinstance(metric, Histogram):
+            for key, (buckets, total, count) in sorted(metric.samples().items()):
+                for bound, cumulative in buckets:
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        else:
+            for key, value in sorted(metric.samples().items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,106 @@
+import dataclasses
+import json
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core import settings
+from app.dto.profile import UserProfile
+from app.services.lru_cache import LRUCache
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+PROMPT_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+# ${name} placeholders; other braces are left alone so templates can contain JSON or prompt-template syntax
+_FIELD = re.compile(r"\$\{(\w+)\}")
+
+
+class PromptTemplate:
+    """A template split once into literal text and field names, so rendering is a single join."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        parts = _FIELD.split(text)
+        self._literals: Tuple[str, ...] = tuple(parts[0::2])
+        self._fields: Tuple[str, ...] = tuple(parts[1::2])
+        self.fields = frozenset(self._fields)
+
+    def render(self, values: Dict[str, object]) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name!r} is missing {', '.join(sorted(missing))}")
+        out = [self._literals[0]]
+        for field, literal in zip(self._fields, self._literals[1:]):
+            out.append(str(values[field]))
+            out.append(literal)
+        return "".join(out)
+
+
+class PromptService:
+    """
+    Registry of the prompt templates in app/prompts.
+
+    Templates are read and compiled once. Rendered prompts are memoized by
+    template, user profile and variables, so a session's system prompts are
+    built once and stay byte-identical from turn to turn. Per-turn values
+    such as the current time belong in the prompt context, not in templates
+    (see ChatService.build_messages).
+    """
+
+    def __init__(self, prompt_dir: Path = PROMPT_DIR, cache_size: int = settings.PROMPT_CACHE_SIZE):
+        self.prompt_dir = Path(prompt_dir)
+        self.templates: Dict[str, PromptTemplate] = {}
+        self.profiles: Dict[str, UserProfile] = {}
+        self._rendered = LRUCache(cache_size)
+        self.load()
+
+    def load(self):
+        templates = {
+            path.stem: PromptTemplate(path.stem, path.read_text(encoding="utf-8"))
+            for path in sorted(self.prompt_dir.glob("*.txt"))
+        }
+        profiles = {}
+        profiles_path = self.prompt_dir / "profiles.json"
+        if profiles_path.exists():
+            profiles = {
+                profile_id: UserProfile(**values)
+                for profile_id, values in json.loads(profiles_path.read_text(encoding="utf-8")).items()
+            }
+        self.templates, self.profiles = templates, profiles
+        self._rendered.clear()
+        logger.info("Loaded prompt templates", templates=len(templates), profiles=len(profiles))
+
+    def profile(self, profile_id: Optional[str] = None) -> UserProfile:
+        profile = self.profiles.get(profile_id or settings.DEFAULT_USER_PROFILE)
+        if profile is None:
+            logger.warning("Unknown user profile, using default", profile_id=profile_id)
+            profile = self.profiles[settings.DEFAULT_USER_PROFILE]
+        return profile
+
+    def render(self, name: str, profile: Optional[UserProfile] = None, **variables) -> str:
+        """
+        Render template `name` with the profile's fields and `variables`, which take precedence.
+
+        Raises:
+            KeyError: If the template does not exist or a field has no value
+        """
+        key = (name, profile, tuple(sorted(variables.items())))
+        prompt = self._rendered.get(key)
+        if prompt is None:
+            values = dataclasses.asdict(profile) if profile else {}
+            values.update(variables)
+            prompt = self.templates[name].render(values)
+            self._rendered.set(key, prompt)
+        return prompt
+
+
+_prompt_service: Optional[PromptService] = None
+
+
+def get_prompt_service() -> PromptService:
+    global _prompt_service
+    if _prompt_service is None:
+        _prompt_service = PromptService()
+    return _prompt_service
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from asgiref.sync import SyncToAsync
+from django.db.backends.signals import connection_created
+
+from app.services.metrics import counter, gauge, histogram
+
+db_queries = counter("db_queries_total", "Database queries by connection alias and statement (select, insert, update, delete, other)")
+db_query_seconds = histogram("db_query_seconds", "Database query latency by connection alias and statement")
+executor_queue_depth = gauge(
+    "executor_queue_depth",
+    "Calls waiting for a thread: sync_to_async is the thread-sensitive ORM thread, default the event loop's executor",
+)
+
+STATEMENTS = {"select", "insert", "update", "delete"}
+
+
+def _statement(sql) -> str:
+    words = str(sql).lstrip().split(None, 1)
+    statement = words[0].lower() if words else ""
+    return statement if statement in STATEMENTS else "other"
+
+
+class QueryMetrics:
+    """Django execute wrapper that counts and times every query on a connection."""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            statement = _statement(sql)
+            db_queries.inc(alias=self.alias, statement=statement)
+            db_query_seconds.observe(time.perf_counter() - start, alias=self.alias, statement=statement)
+
+
+def _install_query_metrics(sender, connection, **kwargs):
+    # Fired on every (re)connect of the thread's connection object; wrap it once
+    if not any(isinstance(wrapper, QueryMetrics) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(QueryMetrics(connection.alias))
+
+
+def instrument_database():
+    """Count and time the queries of every database connection opened from now on."""
+    connection_created.connect(_install_query_metrics, dispatch_uid="query_metrics")
+
+
+def _queue_depth(executor: Optional[ThreadPoolExecutor]) -> int:
+    work_queue = getattr(executor, "_work_queue", None)
+    return work_queue.qsize() if work_queue is not None else 0
+
+
+def instrument_executors(loop: asyncio.AbstractEventLoop):
+    """Report how many calls are queued for the ORM thread and for `loop`'s default executor."""
+    executor_queue_depth.set_function(lambda: _queue_depth(SyncToAsync.single_thread_executor), executor="sync_to_async")
+    executor_queue_depth.set_function(lambda: _queue_depth(getattr(loop, "_default_executor", None)), executor="default")
@@ -0,0 +1,285 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from app.actor.coordinator_actor import CoordinatorActor
+from app.core import settings
+from app.dto.chat import ChatMessage
+from app.dto.coordinator import CoordinatorMemory
+from app.dto.session import SessionDTO, UserType
+from app.services.actor_memory_store import get_actor_memory_store
+from app.services.session_store import DistributedSessionStore, get_session_store
+from app.services.transcription_service import LiveTranscriptionSession
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class SessionLimitExceeded(Exception):
+    pass
+
+
+@dataclass
+class LiveSession:
+    session_dto: SessionDTO
+    coordinator_actor: CoordinatorActor
+    connections: int = 0
+    last_active: float = field(default_factory=time.monotonic)
+    # Open live transcription stream and the task answering its utterances
+    transcription: Optional[LiveTranscriptionSession] = None
+    transcription_task: Optional[asyncio.Task] = None
+    # Open WebSockets, closed if the session moves to another worker
+    sockets: Set = field(default_factory=set)
+    # Length of chat_history when the session was last saved to the distributed store
+    saved_turns: int = 0
+    # Set once the session has left this worker's registry
+    detached: bool = False
+
+    @property
+    def id(self) -> str:
+        return self.session_dto.id
+
+    @property
+    def chat_history(self) -> list[ChatMessage]:
+        return self.session_dto.chat_history
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+
+class SessionRegistry:
+    """
+    Per-connection session state keyed by session_id.
+
+    Each session owns its coordinator actor and SessionDTO (with chat history),
+    so concurrent connections never share state. Sessions with no open
+    connection are evicted once idle for `idle_timeout` seconds, and the number
+    of live sessions is capped at `max_sessions`.
+
+    With a `session_store`, sessions are leased so that only one worker holds
+    each one. A reconnect that lands on another worker takes the session over:
+    the owner saves and hands it off, and the new worker loads its state.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = settings.SESSION_MAX_LIVE,
+        idle_timeout: int = settings.SESSION_IDLE_TIMEOUT,
+        session_store: Optional[DistributedSessionStore] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_store = session_store or get_session_store()
+        self._sessions: "OrderedDict[str, LiveSession]" = OrderedDict()
+        self._opening: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._eviction_task: Optional[asyncio.Task] = None
+        self._lease_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        return self._sessions.get(session_id)
+
+    async def acquire(self, session_id: str, role: str, language: str) -> LiveSession:
+        """
+        Attach a connection to the session, creating it if needed.
+
+        Raises:
+            SessionLimitExceeded: If the registry is full and no idle session can be evicted
+        """
+        self.evict_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            if session_id not in self._opening:
+                if len(self._sessions) >= self.max_sessions and not self._evict_lru():
+                    raise SessionLimitExceeded(f"Too many live sessions ({self.max_sessions})")
+                self._opening[session_id] = asyncio.create_task(self._open_session(session_id, role, language))
+            try:
+                session = await asyncio.shield(self._opening[session_id])
+            finally:
+                if self._opening.get(session_id) and self._opening[session_id].done():
+                    del self._opening[session_id]
+        else:
+            # A reconnect keeps the chat history but follows the latest client settings
+            session.session_dto.active_user = UserType(role)
+            session.session_dto.language = language
+            self._sessions.move_to_end(session_id)
+        session.connections += 1
+        session.touch()
+        return session
+
+    async def _open_session(self, session_id: str, role: str, language: str) -> LiveSession:
+        session_dto = None
+        if self.session_store:
+            await self.session_store.acquire(session_id)
+            session_dto = await self.session_store.load(session_id)
+        session = self._create_session(session_id, role, language, session_dto)
+        self._sessions[session_id] = session
+        logger.info("Session created", session_id=session_id, live_sessions=len(self._sessions),
+                    restored_turns=len(session.chat_history))
+        await self._prefetch_memory(session)
+        return session
+
+    async def release(self, session: LiveSession):
+        session.connections = max(session.connections - 1, 0)
+        session.touch()
+        if session.connections == 0 and self.session_store and not session.detached:
+            await self._save([session])
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        expired = [
+            session_id
+            for session_id, session in self._sessions.items()
+            if session.connections == 0 and now - session.last_active > self.idle_timeout
+        ]
+        for session_id in expired:
+            self._evict(session_id)
+        return len(expired)
+
+    def _evict_lru(self) -> bool:
+        for session_id, session in self._sessions.items():
+            if session.connections == 0:
+                self._evict(session_id)
+                return True
+        return False
+
+    def _evict(self, session_id: str):
+        session = self._detach(session_id)
+        if session and self.session_store:
+            self._run_in_background(self._save_and_release(session))
+        logger.info("Session evicted", session_id=session_id, live_sessions=len(self._sessions))
+
+    def _detach(self, session_id: str) -> Optional[LiveSession]:
+        """Drop the session from this worker, closing its sockets and stopping its actors."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return None
+        session.detached = True
+        session.coordinator_actor.stop()
+        for websocket in list(session.sockets):
+            self._run_in_background(websocket.close(code=4001, reason="Session moved"))
+        return session
+
+    def _run_in_background(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _create_session(self, session_id: str, role: str, language: str, session_dto: Optional[SessionDTO] = None) -> LiveSession:
+        if session_dto is None:
+            session_dto = SessionDTO(
+                id=session_id,
+                active_user=UserType(role),
+                language=language,
+            )
+        else:
+            # Restored from another worker; follow the reconnecting client's settings
+            session_dto.active_user = UserType(role)
+            session_dto.language = language
+        # Actor ids derive from the session id so a reconnect picks up persisted memory
+        coordinator_actor = CoordinatorActor(
+            initial_memory=CoordinatorMemory(active_actor="assistant"),
+            actor_id=f"session/{session_id}",
+            memory_store=get_actor_memory_store(),
+        )
+        return LiveSession(session_dto=session_dto, coordinator_actor=coordinator_actor,
+                           saved_turns=len(session_dto.chat_history))
+
+    async def _prefetch_memory(self, session: LiveSession):
+        """Load the memory of the whole actor tree in one round trip instead of one per actor."""
+        store = session.coordinator_actor.memory_store
+        if store is None:
+            return
+        try:
+            memory_classes = session.coordinator_actor.memory_classes()
+            if self.session_store:
+                # Another worker may have written newer memory since this one last held the session
+                store.invalidate(memory_classes)
+            await store.prefetch(memory_classes)
+        except Exception as e:
+            # Actors fall back to loading their own memory on first use
+            logger.error("Failed to prefetch actor memory", session_id=session.id, error=str(e))
+
+    async def _save(self, sessions: List[LiveSession]):
+        try:
+            await self.session_store.save([session.session_dto for session in sessions])
+        except Exception as e:
+            logger.error("Failed to save sessions", count=len(sessions), error=str(e))
+            return
+        for session in sessions:
+            session.saved_turns = len(session.chat_history)
+
+    async def _save_and_release(self, session: LiveSession):
+        """Persist everything the next owner needs, then give up the lease."""
+        if session.saved_turns != len(session.chat_history):
+            await self._save([session])
+        memory_store = session.coordinator_actor.memory_store
+        if memory_store:
+            await memory_store.flush(trigger="handoff")
+        await self.session_store.release(session.id)
+
+    async def _hand_off(self, session_id: str):
+        session = self._detach(session_id)
+        if session:
+            await self._save_and_release(session)
+            logger.info("Session handed off", session_id=session_id, live_sessions=len(self._sessions))
+
+    async def _maintain_leases(self, renew: bool):
+        for session_id in await self.session_store.handoff_requests(list(self._sessions)):
+            await self._hand_off(session_id)
+        if not renew:
+            return
+        changed = [session for session in self._sessions.values() if session.saved_turns != len(session.chat_history)]
+        if changed:
+            await self._save(changed)
+        for session_id in await self.session_store.renew(list(self._sessions)):
+            logger.warning("Session lease lost to another worker", session_id=session_id)
+            self._detach(session_id)
+
+    def start(self, interval: int = settings.SESSION_EVICTION_INTERVAL):
+        if self._eviction_task is None or self._eviction_task.done():
+            self._eviction_task = asyncio.create_task(self._run_eviction_loop(interval))
+        if self.session_store and (self._lease_task is None or self._lease_task.done()):
+            self._lease_task = asyncio.create_task(self._run_lease_loop())
+
+    async def stop(self):
+        for task in (self._eviction_task, self._lease_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._eviction_task = None
+        self._lease_task = None
+        if self.session_store:
+            # Shutting down: hand every session back so another worker can pick it up
+            for session_id in list(self._sessions):
+                await self._hand_off(session_id)
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    async def _run_lease_loop(self):
+        last_renewal = time.monotonic()
+        while True:
+            await asyncio.sleep(self.session_store.poll_interval)
+            renew = time.monotonic() - last_renewal >= self.session_store.lease_ttl / 3
+            if renew:
+                last_renewal = time.monotonic()
+            try:
+                await self._maintain_leases(renew)
+            except Exception as e:
+                logger.error("Session lease maintenance failed", error=str(e))
+
+    async def _run_eviction_loop(self, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error("Session eviction failed", error=str(e))
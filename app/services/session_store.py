@@ -0,0 +1,155 @@
+import asyncio
+import dataclasses
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from app.core import settings
+from app.dto.chat import ChatMessage
+from app.dto.session import SessionDTO, UserType
+from app.services.metrics import counter
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+session_handoffs = counter("session_handoffs_total", "Sessions moved between workers by outcome (released, forced)")
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def serialize_session(session_dto: SessionDTO) -> str:
+    data = dataclasses.asdict(session_dto)
+    data["active_user"] = session_dto.active_user.value
+    data["chat_history"] = [[message.role, message.content] for message in session_dto.chat_history]
+    return json.dumps(data, separators=(",", ":"))
+
+
+def deserialize_session(data: str) -> SessionDTO:
+    values = json.loads(data)
+    values["active_user"] = UserType(values["active_user"])
+    values["chat_history"] = [ChatMessage(role=role, content=content) for role, content in values["chat_history"]]
+    names = {field.name for field in dataclasses.fields(SessionDTO)}
+    return SessionDTO(**{name: value for name, value in values.items() if name in names})
+
+
+def _cache_call(method, *args, **kwargs):
+    # Cache calls are thread-safe; don't queue them behind ORM work on the shared sync thread
+    return sync_to_async(getattr(cache, method), thread_sensitive=False)(*args, **kwargs)
+
+
+class DistributedSessionStore:
+    """
+    Session ownership and state shared between workers through the Django cache (Redis).
+
+    A worker owns a session while it holds the session's lease, which expires
+    after `lease_ttl` seconds unless renewed. A worker that gets a reconnect
+    for a session owned elsewhere posts a handoff request; the owner saves the
+    session and releases the lease, and the new worker loads the saved state.
+    If the owner does not answer within `handoff_timeout`, the lease is taken over.
+    """
+
+    def __init__(
+        self,
+        worker_id: str = WORKER_ID,
+        lease_ttl: int = settings.SESSION_LEASE_TTL,
+        state_ttl: int = settings.SESSION_STATE_TTL,
+        handoff_timeout: float = settings.SESSION_HANDOFF_TIMEOUT,
+        poll_interval: float = settings.SESSION_HANDOFF_POLL_INTERVAL,
+    ):
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.state_ttl = state_ttl
+        self.handoff_timeout = handoff_timeout
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _lease_key(session_id: str) -> str:
+        return f"session_lease_{session_id}"
+
+    @staticmethod
+    def _handoff_key(session_id: str) -> str:
+        return f"session_handoff_{session_id}"
+
+    @staticmethod
+    def _state_key(session_id: str) -> str:
+        return f"session_state_{session_id}"
+
+    async def acquire(self, session_id: str):
+        """Take the session's lease, asking the current owner to hand it off if needed."""
+        lease_key = self._lease_key(session_id)
+        if await _cache_call("add", lease_key, self.worker_id, timeout=self.lease_ttl):
+            return
+        owner = await _cache_call("get", lease_key)
+        if owner == self.worker_id:
+            await _cache_call("touch", lease_key, timeout=self.lease_ttl)
+            return
+        logger.info("Requesting session handoff", session_id=session_id, owner=owner)
+        await _cache_call("set", self._handoff_key(session_id), self.worker_id, timeout=int(self.handoff_timeout) + 1)
+        deadline = time.monotonic() + self.handoff_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if await _cache_call("add", lease_key, self.worker_id, timeout=self.lease_ttl):
+                session_handoffs.inc(outcome="released")
+                break
+        else:
+            # The owner is gone or stuck; it gives the session up when its renewal fails
+            logger.warning("Session owner did not hand off, taking over", session_id=session_id, owner=owner)
+            await _cache_call("set", lease_key, self.worker_id, timeout=self.lease_ttl)
+            session_handoffs.inc(outcome="forced")
+        await _cache_call("delete", self._handoff_key(session_id))
+
+    async def renew(self, session_ids: Iterable[str]) -> List[str]:
+        """Extend the leases still held by this worker; returns the sessions whose lease was lost."""
+        keys = {self._lease_key(session_id): session_id for session_id in session_ids}
+        if not keys:
+            return []
+        owners = await _cache_call("get_many", list(keys))
+        lost = []
+        for key, session_id in keys.items():
+            owner = owners.get(key)
+            if owner == self.worker_id:
+                await _cache_call("touch", key, timeout=self.lease_ttl)
+            elif owner is None and await _cache_call("add", key, self.worker_id, timeout=self.lease_ttl):
+                logger.warning("Session lease expired, re-acquired", session_id=session_id)
+            else:
+                lost.append(session_id)
+        return lost
+
+    async def handoff_requests(self, session_ids: Iterable[str]) -> List[str]:
+        """Sessions that another worker is waiting to take over."""
+        keys = {self._handoff_key(session_id): session_id for session_id in session_ids}
+        if not keys:
+            return []
+        requests = await _cache_call("get_many", list(keys))
+        return [keys[key] for key, requester in requests.items() if requester != self.worker_id]
+
+    async def release(self, session_id: str):
+        lease_key = self._lease_key(session_id)
+        if await _cache_call("get", lease_key) == self.worker_id:
+            await _cache_call("delete", lease_key)
+
+    async def save(self, sessions: Iterable[SessionDTO]):
+        states: Dict[str, str] = {self._state_key(dto.id): serialize_session(dto) for dto in sessions}
+        if states:
+            await _cache_call("set_many", states, timeout=self.state_ttl)
+
+    async def load(self, session_id: str) -> Optional[SessionDTO]:
+        data = await _cache_call("get", self._state_key(session_id))
+        return deserialize_session(data) if data else None
+
+
+_session_store: Optional[DistributedSessionStore] = None
+
+
+def get_session_store() -> Optional[DistributedSessionStore]:
+    """Process-wide store when DISTRIBUTED_SESSIONS is on, otherwise None."""
+    global _session_store
+    if _session_store is None and settings.DISTRIBUTED_SESSIONS:
+        _session_store = DistributedSessionStore()
+    return _session_store
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, List, Optional
+
+from app.dto.session import ResponseDTO
+from app.services.metrics import counter
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+speculation_hits = counter("speculation_hits_total", "Speculative replies that were kept")
+speculation_misses = counter("speculation_misses_total", "Speculative replies that were cancelled")
+speculation_wasted_tokens = counter(
+    "speculation_wasted_tokens_total",
+    "Completion tokens (streamed chunks) generated by cancelled speculative replies",
+)
+
+
+class Speculation:
+    """
+    Runs a streamed reply ahead of the routing decision.
+
+    `response` must produce a ResponseDTO with a stream; the stream is consumed
+    eagerly into a buffer so generation starts immediately. `commit` hands the
+    reply over (replaying what was buffered), `cancel` stops generation and
+    records the chunks produced so far as wasted.
+    """
+
+    def __init__(self, response: Awaitable[ResponseDTO]):
+        self._chunks: asyncio.Queue = asyncio.Queue()
+        self._generated: List[str] = []
+        self._task = asyncio.create_task(self._run(response))
+        # Errors are surfaced by commit(); don't warn about them if the speculation is dropped
+        self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _run(self, response: Awaitable[ResponseDTO]) -> ResponseDTO:
+        try:
+            response = await response
+            async for delta in response.stream:
+                self._generated.append(delta)
+                self._chunks.put_nowait(delta)
+            return response
+        finally:
+            self._chunks.put_nowait(None)
+
+    async def commit(self, stream: bool) -> ResponseDTO:
+        speculation_hits.inc()
+        if not stream:
+            response = await self._task
+            return ResponseDTO(response="".join(self._generated),
+                               artifact_url=response.artifact_url,
+                               artifact_type=response.artifact_type)
+        return ResponseDTO(response="", artifact_url="", artifact_type="", stream=self._replay())
+
+    async def _replay(self):
+        try:
+            while (delta := await self._chunks.get()) is not None:
+                yield delta
+            # Surface any error raised while generating
+            await self._task
+        finally:
+            # The consumer stopped reading early (client gone, turn interrupted): stop generating too
+            if not self._task.done():
+                self._task.cancel()
+
+    def cancel(self, reason: Optional[str] = None):
+        self._task.cancel()
+        speculation_misses.inc()
+        speculation_wasted_tokens.inc(len(self._generated))
+        logger.info("Speculative reply cancelled", reason=reason, wasted_chunks=len(self._generated))
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import random
+import secrets
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core import settings
+from app.services.metrics import counter
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+spans_dropped = counter("trace_spans_dropped_total", "Finished spans dropped because the export buffer was full")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    sampled = True
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _UnsampledSpan:
+    """Stands in for spans of traces that are not recorded; its children are not recorded either."""
+
+    sampled = False
+
+    def set(self, **attributes):
+        pass
+
+
+UNSAMPLED = _UnsampledSpan()
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """The innermost active span, or a span that ignores attributes outside of a recorded trace."""
+    return _current_span.get() or UNSAMPLED
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    async def export(self, spans: List[Span]):
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """Posts spans as OTLP/HTTP JSON, e.g. to a local OpenTelemetry collector or Jaeger on :4318."""
+
+    def __init__(self, url: str, service_name: str = "assistant"):
+        self.url = url
+        self.service_name = service_name
+
+    async def export(self, spans: List[Span]):
+        from app.services.http_client import get_http_client
+
+        response = await get_http_client().request("POST", self.url, json=self._payload(spans))
+        if response.status_code >= 300:
+            raise Exception(f"Collector returned {response.status_code}: {response.text}")
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [self._span(span) for span in spans]}],
+        }]}
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        start_ns = int(span.start_time * 1e9)
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((span.duration_ms or 0) * 1e6)),
+            "attributes": [self._attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return otlp_span
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Tracer:
+    """
+    Per-turn traces built from nested spans.
+
+    The active span is kept in a context variable, so spans opened in tasks
+    and actors started from a turn become its children. A span opened with
+    no active span starts a new trace, which is recorded with probability
+    `sample_rate`. Finished spans are buffered and exported in batches every
+    `flush_interval` seconds; with no exporter, spans cost almost nothing.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter],
+        sample_rate: float = settings.TRACE_SAMPLE_RATE,
+        flush_interval: float = settings.TRACE_FLUSH_INTERVAL,
+        max_buffer: int = settings.TRACE_MAX_BUFFER,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Span] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, **attributes):
+        """Start a span under the active one without making it active; finish it with `end_span`."""
+        if not self.enabled:
+            return UNSAMPLED
+        parent = _current_span.get()
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                return UNSAMPLED
+            return Span(name, secrets.token_hex(16), secrets.token_hex(8), None, attributes)
+        if not parent.sampled:
+            return UNSAMPLED
+        return Span(name, parent.trace_id, secrets.token_hex(8), parent.span_id, attributes)
+
+    def end_span(self, span, error: Optional[BaseException] = None):
+        if not span.sampled:
+            return
+        span.duration_ms = round((time.perf_counter() - span._start) * 1000, 3)
+        if error is not None:
+            span.error = repr(error)
+        if len(self._buffer) >= self.max_buffer:
+            spans_dropped.inc()
+            return
+        self._buffer.append(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """Run the block in a new span, which is active for everything called from it."""
+        if not self.enabled:
+            yield UNSAMPLED
+            return
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def use(self, span):
+        """Make a span from `start_span` the active one for the block, without ending it."""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    async def flush(self):
+        spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        try:
+            await self.exporter.export(spans)
+        except Exception as e:
+            logger.error("Failed to export spans", count=len(spans), error=str(e))
+
+    def start(self):
+        if self.enabled and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._run_flush_loop())
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self.enabled:
+            await self.flush()
+
+    async def _run_flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def _create_exporter() -> Optional[SpanExporter]:
+    if settings.TRACE_EXPORTER == "jsonl":
+        return JsonlSpanExporter(settings.TRACE_EXPORT_PATH)
+    if settings.TRACE_EXPORTER == "otlp":
+        return OTLPHttpSpanExporter(settings.TRACE_COLLECTOR_URL)
+    return None
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(_create_exporter())
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Shortcut for `get_tracer().span(...)`."""
+    return get_tracer().span(name, **attributes)
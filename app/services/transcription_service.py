@@ -1,13 +1,177 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, List, Optional
+
 from deepgram import Deepgram
 from app.core import settings
-class TranscriptionService:
+from app.dto.transcription import TranscriptEvent
+from app.services.tracing import span
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class LiveTranscriptionBackend(ABC):
+    """
+    A live speech-to-text connection.
+    Audio chunks go in through `send`, transcript events come out of `events`.
+    """
+
     def __init__(self):
-        self.deepgram = Deepgram(settings.DEEPGRAM_API_KEY)
+        self._events: asyncio.Queue = asyncio.Queue()
 
-    async def transcribe_audio(self, audio_data: bytes) -> str:
-        source = {'buffer': audio_data, 'mimetype': 'audio/wav'}
-        response = await self.deepgram.transcription.prerecorded(source, {
+    @abstractmethod
+    async def start(self):
+        pass
+
+    @abstractmethod
+    def send(self, chunk: bytes):
+        pass
+
+    @abstractmethod
+    async def finish(self):
+        """Flush buffered audio; the event stream ends once the backend is done."""
+        pass
+
+    def close(self):
+        """Drop the connection without waiting for pending transcripts; the event stream ends at once."""
+        self._close()
+
+    def _emit(self, event: TranscriptEvent):
+        self._events.put_nowait(event)
+
+    def _close(self):
+        self._events.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        while (event := await self._events.get()) is not None:
+            yield event
+
+
+class DeepgramLiveBackend(LiveTranscriptionBackend):
+    def __init__(self, deepgram: Deepgram, language: str = "en"):
+        super().__init__()
+        self.deepgram = deepgram
+        self.language = language
+        self._live = None
+
+    async def start(self):
+        self._live = await self.deepgram.transcription.live({
             'smart_format': True,
             'model': 'general',
+            'language': self.language,
+            'interim_results': True,
+            'endpointing': 300,
+            'utterance_end_ms': 1000,
         })
-        return response['results']['channels'][0]['alternatives'][0]['transcript'] 
\ No newline at end of file
+        self._live.register_handler(self._live.event.TRANSCRIPT_RECEIVED, self._on_message)
+        self._live.register_handler(self._live.event.ERROR, self._on_error)
+        self._live.register_handler(self._live.event.CLOSE, lambda _: self._close())
+
+    def send(self, chunk: bytes):
+        self._live.send(chunk)
+
+    async def finish(self):
+        await self._live.finish()
+
+    def close(self):
+        # The SDK's finish() waits for the final transcripts; ask Deepgram to close and stop listening instead
+        self._live.send(json.dumps({"type": "CloseStream"}))
+        super().close()
+
+    def _on_message(self, message: dict):
+        if message.get('type') == 'Results':
+            self._emit(TranscriptEvent(
+                text=message['channel']['alternatives'][0]['transcript'],
+                is_final=message.get('is_final', False),
+                speech_final=message.get('speech_final', False),
+            ))
+        elif message.get('type') == 'UtteranceEnd':
+            self._emit(TranscriptEvent(text="", is_final=True, speech_final=True))
+
+    def _on_error(self, error):
+        logger.error("Live transcription error", error=str(error))
+
+
+class FakeLiveBackend(LiveTranscriptionBackend):
+    """
+    Offline backend that replays a canned transcript.
+    Each audio chunk reveals a few more words as an interim result, and
+    `finish` emits the whole transcript as a final, complete utterance.
+    """
+
+    def __init__(self, transcript: str = settings.FAKE_TRANSCRIPT, words_per_chunk: int = 2):
+        super().__init__()
+        self.words = transcript.split()
+        self.words_per_chunk = words_per_chunk
+        self._revealed = 0
+
+    async def start(self):
+        pass
+
+    def send(self, chunk: bytes):
+        self._revealed = min(self._revealed + self.words_per_chunk, len(self.words))
+        self._emit(TranscriptEvent(text=" ".join(self.words[:self._revealed])))
+
+    async def finish(self):
+        self._emit(TranscriptEvent(text=" ".join(self.words), is_final=True, speech_final=True))
+        self._close()
+
+
+class LiveTranscriptionSession:
+    """Assembles a backend's transcript events into complete utterances."""
+
+    def __init__(self, backend: LiveTranscriptionBackend, on_interim: Optional[Callable[[str], None]] = None):
+        self.backend = backend
+        self.on_interim = on_interim
+
+    def send(self, chunk: bytes):
+        self.backend.send(chunk)
+
+    async def finish(self):
+        await self.backend.finish()
+
+    def close(self):
+        self.backend.close()
+
+    async def utterances(self) -> AsyncIterator[str]:
+        segments: List[str] = []
+        async for event in self.backend.events():
+            if event.is_final and event.text:
+                segments.append(event.text)
+            elif not event.is_final and self.on_interim:
+                self.on_interim(" ".join(segments + [event.text]))
+            if event.speech_final and segments:
+                yield " ".join(segments)
+                segments = []
+        if segments:
+            yield " ".join(segments)
+
+
+class TranscriptionService:
+    def __init__(self, backend: str = settings.TRANSCRIPTION_BACKEND):
+        self.backend = backend
+        self.deepgram = Deepgram(settings.DEEPGRAM_API_KEY) if backend == "deepgram" else None
+
+    async def transcribe_audio(self, audio_data: bytes) -> str:
+        with span("transcribe", backend=self.backend, audio_bytes=len(audio_data)) as transcribe_span:
+            if self.backend == "fake":
+                return settings.FAKE_TRANSCRIPT
+            source = {'buffer': audio_data, 'mimetype': 'audio/wav'}
+            response = await self.deepgram.transcription.prerecorded(source, {
+                'smart_format': True,
+                'model': 'general',
+            })
+            transcript = response['results']['channels'][0]['alternatives'][0]['transcript']
+            transcribe_span.set(chars=len(transcript))
+            return transcript
+
+    async def start_stream(self, language: str = "en", on_interim: Optional[Callable[[str], None]] = None) -> LiveTranscriptionSession:
+        """Open a live transcription stream that audio chunks can be sent to as they are recorded."""
+        if self.backend == "fake":
+            backend = FakeLiveBackend()
+        else:
+            backend = DeepgramLiveBackend(self.deepgram, language)
+        await backend.start()
+        return LiveTranscriptionSession(backend, on_interim)
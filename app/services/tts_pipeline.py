@@ -0,0 +1,141 @@
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from app.core import settings
+from app.services.audio_service import AudioService
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class SentenceSplitter:
+    """
+    Incrementally splits streamed text into sentences.
+
+    A sentence ends at terminal punctuation followed by whitespace, or at a newline.
+    Text after the last boundary is held back until more text arrives or `flush` is called.
+    """
+
+    _BOUNDARY = re.compile(r"[.!?।]+[\"')\]]*\s+|\n+")
+    _ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "st", "vs", "e.g", "i.e"}
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if self._ends_with_abbreviation(sentence):
+                continue
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        return sentence or None
+
+    def _ends_with_abbreviation(self, sentence: str) -> bool:
+        words = sentence.rstrip(".").rsplit(None, 1)
+        return bool(words) and sentence.endswith(".") and words[-1].lower() in self._ABBREVIATIONS
+
+
+class StreamingTTSPipeline:
+    """
+    Overlaps LLM generation with speech synthesis.
+
+    Streamed text is split at sentence boundaries, each sentence is synthesized
+    as soon as it is complete (at most `max_concurrency` at a time), and the
+    audio is sent in sentence order, so playback starts after the first sentence.
+    Every sentence goes through the `audio_<sha256>` cache on its own.
+
+    Audio is read from the provider as it is generated. With `stream_chunks`
+    each chunk is sent as soon as it arrives, so the frames of a reply form one
+    continuous MP3 stream; otherwise a sentence is sent as one MP3 frame once
+    its audio is complete.
+    """
+
+    def __init__(
+        self,
+        audio_service: AudioService,
+        max_concurrency: int = settings.TTS_MAX_CONCURRENCY,
+        stream_chunks: bool = settings.TTS_STREAM_CHUNKS,
+    ):
+        self.audio_service = audio_service
+        self.max_concurrency = max_concurrency
+        self.stream_chunks = stream_chunks
+
+    async def run(self, text_stream: AsyncIterator[str], send_audio: Callable[[bytes], Awaitable[None]]) -> int:
+        """
+        Synthesize `text_stream` sentence by sentence and send the audio in order.
+
+        Returns:
+            int: The number of audio frames sent
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending: asyncio.Queue = asyncio.Queue()
+
+        async def synthesize(sentence: str, chunks: asyncio.Queue):
+            try:
+                async with semaphore:
+                    async for chunk in self.audio_service.stream_cached_text_to_speech(sentence):
+                        chunks.put_nowait(chunk)
+            finally:
+                chunks.put_nowait(None)
+
+        def schedule(sentence: Optional[str]):
+            # Skip fragments with nothing to say, e.g. a trailing "..."
+            if sentence and any(c.isalnum() for c in sentence):
+                chunks = asyncio.Queue()
+                pending.put_nowait((asyncio.create_task(synthesize(sentence, chunks)), chunks))
+
+        async def produce():
+            splitter = SentenceSplitter()
+            try:
+                async for delta in text_stream:
+                    for sentence in splitter.feed(delta):
+                        schedule(sentence)
+                schedule(splitter.flush())
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        current = None
+        sent = 0
+        try:
+            while (current := await pending.get()) is not None:
+                sent += await self._send_sentence(*current, send_audio)
+            await producer
+        except BaseException:
+            producer.cancel()
+            if current:
+                current[0].cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item:
+                    item[0].cancel()
+            raise
+        logger.info("Streamed audio response", frames=sent)
+        return sent
+
+    async def _send_sentence(
+        self, task: asyncio.Task, chunks: asyncio.Queue, send_audio: Callable[[bytes], Awaitable[None]]
+    ) -> int:
+        parts = []
+        while (chunk := await chunks.get()) is not None:
+            if self.stream_chunks:
+                await send_audio(chunk)
+            parts.append(chunk)
+        # Raises if synthesis failed
+        await task
+        if self.stream_chunks:
+            return len(parts)
+        await send_audio(b"".join(parts))
+        return 1
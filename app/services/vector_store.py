@@ -1,8 +1,11 @@
 import asyncio
+import hashlib
+import json
 import logging
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
+from types import SimpleNamespace
 from typing import (
     Optional,
     List,
@@ -13,19 +16,40 @@ from typing import (
     Union,
     ClassVar,
     Collection,
+    Tuple,
 )
 
-from django.db import transaction
-from django.db.models import Q
+from django.db import connections, transaction
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
 from langchain_core.documents import Document as LangChainDocument
 from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from pgvector.django import CosineDistance, L2Distance, MaxInnerProduct
+from pgvector.utils import Vector
 from pydantic import model_validator
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 
+from app.core import settings
 from app.dto.data_embedding import DataEmbeddingDocumentDTO
+from app.dto.ingestion import UpsertResult
 from app.models.models import DataEmbedding
+from app.services.async_db import get_async_database
+from app.services.embedding_cache import CachedEmbeddings
+from app.services.metrics import histogram
+
+vector_store_seconds = histogram(
+    "vector_store_seconds", "PGVector latency by operation (embed_query, embed_queries, search, batch_search)"
+)
+
+# Columns selected by searches that don't load model instances
+RESULT_FIELDS = ("id", "title", "url", "text_override", "text", "metadata", "distance")
+
+
+def content_hash(text: str, metadata: Optional[dict] = None) -> str:
+    """SHA-256 of a text and its metadata, as stored in `DataEmbedding.content_hash`."""
+    payload = json.dumps([text, metadata or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 
 class DistanceStrategy(Enum):
@@ -52,7 +76,10 @@ class PGVector:
         self.__post__init__()
 
     def __post__init__(self) -> None:
-        self.embedding_function = OpenAIEmbeddings(model=self.embedding_model)
+        # Query embeddings are cached; documents are always embedded
+        self.embedding_function = CachedEmbeddings(
+            OpenAIEmbeddings(model=self.embedding_model), self.embedding_model
+        )
         self.embedding_field = (
             "embedding"  # Let factory handle it later based on embedding_model
         )
@@ -75,6 +102,8 @@ class PGVector:
         texts: Iterable[str],
         embeddings: List[List[float]],
         metadatas: Optional[List[dict]] = None,
+        current_version: Optional[str] = None,
+        source: Optional[str] = None,
         **kwargs: Any,
     ) -> List[str]:
         """
@@ -85,17 +114,36 @@ class PGVector:
             embeddings: List of embeddings.
             metadatas: List of metadata associated with the texts.
             current_version: Current version of the data source.
+            source: Name of the data source.
             kwargs: Additional parameters for customization.
 
         Returns:
             List of IDs used for the documents.
         """
 
+        data_embeddings = self.build_data_embeddings(
+            texts, embeddings, metadatas, source=source, version=current_version
+        )
+        # Use bulk_create to insert new records
+        DataEmbedding.objects.bulk_create(data_embeddings)
+
+        return [embedding.id for embedding in data_embeddings]
+
+    @staticmethod
+    def build_data_embeddings(
+        texts: Iterable[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        source: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> List[DataEmbedding]:
+        """Unsaved `DataEmbedding` rows; title, url and text_override are taken from the metadata."""
         if metadatas is None:
             metadatas = [{} for _ in texts]
 
         data_embeddings = []
         for text, metadata, embedding in zip(texts, metadatas, embeddings):
+            digest = content_hash(text, metadata)
             title = metadata.get("title", "") or ""
             url = metadata.get("url", "") or ""
             text_override = metadata.get("text_override")
@@ -115,18 +163,19 @@ class PGVector:
                     text_override=text_override,
                     embedding=embedding,
                     metadata=metadata,
+                    source=source,
+                    version=version,
+                    content_hash=digest,
                 )
             )
-        # Use bulk_create to insert new records
-        DataEmbedding.objects.bulk_create(data_embeddings)
-
-        return [embedding.id for embedding in data_embeddings]
+        return data_embeddings
 
     def add_texts(
         self,
         texts: Iterable[str],
         metadatas: Optional[List[dict]] = None,
         current_version: Optional[str] = None,
+        source: Optional[str] = None,
         **kwargs: Any,
     ) -> List[str]:
         """Run more texts through the embeddings and add to the vectorstore.
@@ -135,15 +184,115 @@ class PGVector:
             texts: Iterable of strings to add to the vectorstore.
             metadatas: Optional list of metadata associated with the texts.
             current_version: Current version of the data source.
+            source: Name of the data source.
             kwargs: vectorstore specific parameters
 
         Returns:
             List of ids from adding the texts into the vectorstore.
         """
-        embeddings = self.embedding_function.embed_documents(list(texts))
+        texts = list(texts)
+        embeddings = self.embedding_function.embed_documents(texts)
         return self.add_embeddings(
-            texts, embeddings, metadatas, current_version, **kwargs
+            texts,
+            embeddings,
+            metadatas,
+            current_version=current_version,
+            source=source,
+            **kwargs,
+        )
+
+    def upsert_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        source: str,
+        current_version: Optional[str] = None,
+    ) -> UpsertResult:
+        """Make the stored rows of `source` match `texts`, embedding only what isn't stored yet.
+
+        Rows are matched on the hash of their text and metadata: texts already
+        stored for the source are kept (and moved to `current_version`), new
+        or changed texts are embedded and inserted, and rows of the source
+        whose content is no longer in the input are deleted. Duplicate texts
+        are stored once.
+
+        Args:
+            texts: Iterable of strings, the full current content of the source.
+            metadatas: Optional list of metadata associated with the texts.
+            source: Name of the data source.
+            current_version: Current version of the data source.
+
+        Returns:
+            Counts of inserted, unchanged and deleted rows.
+        """
+        return async_to_sync(self.aupsert_texts)(
+            texts, metadatas, source=source, current_version=current_version
+        )
+
+    async def aupsert_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        source: str,
+        current_version: Optional[str] = None,
+    ) -> UpsertResult:
+        """Async `upsert_texts`."""
+        from app.services.ingestion import IngestionPipeline
+
+        texts = list(texts)
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+
+        wanted = {}
+        for text, metadata in zip(texts, metadatas):
+            wanted.setdefault(content_hash(text, metadata), (text, metadata))
+
+        keep_ids, stale_ids, stored = await sync_to_async(self._match_stored)(source, wanted)
+        new = (
+            LangChainDocument(page_content=text, metadata=metadata)
+            for digest, (text, metadata) in wanted.items()
+            if digest not in stored
+        )
+        # New rows are embedded and written in chunks; a run that fails part way leaves whole
+        # chunks behind, which the next run matches by hash instead of embedding again
+        ingested = await IngestionPipeline(self, source=source, current_version=current_version).ingest(new)
+        deleted = await sync_to_async(self._finish_upsert)(keep_ids, stale_ids, current_version)
+
+        result = UpsertResult(
+            source=source,
+            version=current_version,
+            inserted=ingested.documents,
+            unchanged=len(keep_ids),
+            deleted=deleted,
+        )
+        self.logger.info(
+            "Upserted %s: %d inserted, %d unchanged, %d deleted",
+            source, result.inserted, result.unchanged, result.deleted,
         )
+        return result
+
+    @staticmethod
+    def _match_stored(source: str, wanted: Dict[str, Any]) -> Tuple[List[int], List[int], set]:
+        """Ids of the stored rows of `source` to keep and to delete, and the hashes already stored."""
+        keep_ids, stale_ids, stored = [], [], set()
+        for row_id, digest in DataEmbedding.objects.filter(source=source).values_list("id", "content_hash"):
+            if digest in wanted and digest not in stored:
+                keep_ids.append(row_id)
+                stored.add(digest)
+            else:
+                stale_ids.append(row_id)
+        return keep_ids, stale_ids, stored
+
+    @staticmethod
+    def _finish_upsert(keep_ids: List[int], stale_ids: List[int], current_version: Optional[str]) -> int:
+        with transaction.atomic():
+            if current_version is not None and keep_ids:
+                DataEmbedding.objects.filter(id__in=keep_ids).exclude(version=current_version).update(
+                    version=current_version
+                )
+            return DataEmbedding.objects.filter(id__in=stale_ids).delete()[0] if stale_ids else 0
 
     @classmethod
     def from_documents(
@@ -152,6 +301,7 @@ class PGVector:
         embedding_model: str,
         current_version: Optional[str] = None,
         *,
+        source: Optional[str] = None,
         distance_strategy: DistanceStrategy = DEFAULT_DISTANCE_STRATEGY,
         **kwargs: Any,
     ):
@@ -161,6 +311,8 @@ class PGVector:
         Args:
             documents: List of Documents to add to the vectorstore.
             embedding_model: EmbeddingModel function to use.
+            current_version: Current version of the data source.
+            source: Name of the data source; when given, its stored rows are upserted.
             distance_strategy: Distance strategy used
             kwargs: Additional keyword arguments.
 
@@ -174,6 +326,7 @@ class PGVector:
             embedding_model,
             metadatas,
             current_version,
+            source=source,
             distance_strategy=distance_strategy,
             **kwargs,
         )
@@ -186,16 +339,22 @@ class PGVector:
         metadatas: Optional[List[dict]] = None,
         current_version: Optional[str] = None,
         *,
+        source: Optional[str] = None,
         distance_strategy: DistanceStrategy = DEFAULT_DISTANCE_STRATEGY,
         **kwargs: Any,
     ):
-        """Return PGVector store initialized from documents and embeddings."""
+        """Return PGVector store initialized from documents and embeddings.
+
+        With a `source`, the texts replace the stored rows of that source
+        through `upsert_texts`; otherwise they are inserted.
+        """
         return cls.__from(
             texts,
             embedding_model,
             metadatas,
-            current_version,
-            distance_strategy,
+            current_version=current_version,
+            source=source,
+            distance_strategy=distance_strategy,
             **kwargs,
         )
 
@@ -205,6 +364,8 @@ class PGVector:
         texts: List[str],
         embedding_model: str,
         metadatas: Optional[List[dict]] = None,
+        current_version: Optional[str] = None,
+        source: Optional[str] = None,
         distance_strategy: DistanceStrategy = DEFAULT_DISTANCE_STRATEGY,
         **kwargs: Any,
     ):
@@ -217,9 +378,13 @@ class PGVector:
             **kwargs,
         )
 
+        if source is not None:
+            store.upsert_texts(texts, metadatas, source=source, current_version=current_version)
+            return store
+
         embeddings = store.get_text_embeddings(texts)
         store.add_embeddings(
-            texts, embeddings, metadatas, **kwargs
+            texts, embeddings, metadatas, current_version=current_version
         )
 
         return store
@@ -241,7 +406,8 @@ class PGVector:
         Returns:
             List of Documents most similar to the query.
         """
-        embedding = self.embedding_function.embed_query(text=query)
+        with vector_store_seconds.time(operation="embed_query"):
+            embedding = self.embedding_function.embed_query(text=query)
         return self.similarity_search_with_score_by_vector(
             embedding=embedding,
             k=k,
@@ -266,13 +432,148 @@ class PGVector:
         Returns:
             List of Documents most similar to the query and score for each.
         """
-        embedding = self.embedding_function.embed_query(query)
+        with vector_store_seconds.time(operation="embed_query"):
+            embedding = self.embedding_function.embed_query(query)
         documents: List[DataEmbeddingDocumentDTO] = (
             self.similarity_search_with_score_by_vector(
                 embedding=embedding, k=k, filter=filter
             )
         )
+        return self._apply_score_threshold(documents, score_threshold)
 
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[DataEmbeddingDocumentDTO]:
+        """Async `similarity_search`: the query is embedded and searched without blocking the event loop."""
+        embedding = await self.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(
+            embedding=embedding,
+            k=k,
+            filter=filter,
+        )
+
+    async def asimilarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[DataEmbeddingDocumentDTO]:
+        """Async `similarity_search_with_relevance_scores`."""
+        embedding = await self.aembed_query(query)
+        documents = await self.asimilarity_search_with_score_by_vector(
+            embedding=embedding, k=k, filter=filter
+        )
+        return self._apply_score_threshold(documents, score_threshold)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        with vector_store_seconds.time(operation="embed_query"):
+            return await self.embedding_function.aembed_query(query)
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+    ) -> List[DataEmbeddingDocumentDTO]:
+        """
+        Run the KNN query on the async connection pool, so concurrent searches
+        run in parallel. Without the pool it runs through the ORM on asgiref's
+        single sync thread, where concurrent searches wait for each other.
+        """
+        database = get_async_database()
+        if database is None:
+            return await sync_to_async(self.similarity_search_with_score_by_vector)(
+                embedding=embedding, k=k, filter=filter
+            )
+        queryset = self._search_queryset(embedding, k, filter).values(*RESULT_FIELDS)
+        with vector_store_seconds.time(operation="search"):
+            rows = await database.fetch_queryset(queryset)
+        return self._results_to_docs([SimpleNamespace(**row) for row in rows])
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries in one request, skipping the cached ones."""
+        with vector_store_seconds.time(operation="embed_queries"):
+            return self.embedding_function.embed_queries(queries)
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        with vector_store_seconds.time(operation="embed_queries"):
+            return await self.embedding_function.aembed_queries(queries)
+
+    def batch_similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter: Optional[dict] = None,
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        """The `k` nearest documents of each embedding, from a single statement."""
+        sql, params = self._batch_search_sql(embeddings, k, filter)
+        with vector_store_seconds.time(operation="batch_search"):
+            with connections[DataEmbedding.objects.db].cursor() as cursor:
+                cursor.execute(sql, params)
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return self._group_batch_results(rows, len(embeddings))
+
+    async def abatch_similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter: Optional[dict] = None,
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        """Async `batch_similarity_search_by_vectors`, on the async connection pool when available."""
+        database = get_async_database()
+        if database is None:
+            return await sync_to_async(self.batch_similarity_search_by_vectors)(
+                embeddings=embeddings, k=k, filter=filter
+            )
+        sql, params = self._batch_search_sql(embeddings, k, filter)
+        with vector_store_seconds.time(operation="batch_search"):
+            rows = await database.fetch(sql, params)
+        return self._group_batch_results(rows, len(embeddings))
+
+    def _batch_search_sql(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        filter: Optional[dict],
+    ) -> Tuple[str, List[Any]]:
+        """
+        Run the single-vector KNN query once per query vector through a LATERAL
+        join, so each vector still gets its own ORDER BY distance LIMIT k scan of
+        the HNSW index, with the same filters.
+        """
+        queryset = self._search_queryset(RawSQL("q.vector::vector", ()), k, filter).values(*RESULT_FIELDS)
+        knn_sql, knn_params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        sql = (
+            "SELECT q.ordinality - 1 AS query_index, d.* "
+            "FROM unnest(%s::text[]) WITH ORDINALITY AS q(vector, ordinality) "
+            f"CROSS JOIN LATERAL ({knn_sql}) AS d "
+            "ORDER BY q.ordinality, d.distance"
+        )
+        return sql, [[Vector._to_db(embedding) for embedding in embeddings], *knn_params]
+
+    def _group_batch_results(
+        self, rows: List[Dict[str, Any]], queries: int
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        results = [[] for _ in range(queries)]
+        for row in rows:
+            index = row.pop("query_index")
+            # Django's psycopg2 connections return jsonb undecoded
+            if isinstance(row["metadata"], str):
+                row["metadata"] = json.loads(row["metadata"])
+            results[index].append(SimpleNamespace(**row))
+        return [self._results_to_docs(result) for result in results]
+
+    def _apply_score_threshold(
+        self,
+        documents: List[DataEmbeddingDocumentDTO],
+        score_threshold: Optional[float],
+    ) -> List[DataEmbeddingDocumentDTO]:
         if any(
             document.similarity_score < 0.0 or document.similarity_score > 1.0
             for document in documents
@@ -301,10 +602,12 @@ class PGVector:
         k: int = 4,
         filter: Optional[dict] = None,
     ) -> List[DataEmbeddingDocumentDTO]:
-        results = self.__query_collection(
-            embedding=embedding, k=k, filter=filter
-        )
-        return self._results_to_docs(results)
+        # The queryset is lazy: the query runs while the results are converted
+        with vector_store_seconds.time(operation="search"):
+            results = self.__query_collection(
+                embedding=embedding, k=k, filter=filter
+            )
+            return self._results_to_docs(results)
 
     def __query_collection(
         self,
@@ -312,6 +615,14 @@ class PGVector:
         k: int = 4,
         filter: Optional[Dict[str, str]] = None,
     ) -> List[DataEmbedding]:
+        return self._search_queryset(embedding, k, filter)
+
+    def _search_queryset(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+    ) -> QuerySet:
         filters = Q()
 
         if filter:
@@ -584,21 +895,28 @@ class PGVectorRetriever:
     async def arrf_invoke(
         self, queries: List[str], *args
     ) -> List[DataEmbeddingDocumentDTO]:
-        tasks = [
-            sync_to_async(self._get_relevant_documents)(query, *args)
-            for query in queries
-        ]
-        doc_list = await asyncio.gather(*tasks)
+        if settings.VECTOR_RRF_BATCHED or get_async_database() is None:
+            # Without the pool, separate KNN queries would take turns on the single ORM
+            # thread; one statement answers all of them instead
+            doc_list = await self._aget_relevant_documents_batch(queries)
+        else:
+            # Embeddings and KNN queries for all queries run concurrently on the pool
+            doc_list = await asyncio.gather(
+                *(self._aget_relevant_documents(query, *args) for query in queries)
+            )
 
         top_k = self.search_kwargs.get("k", None)
 
         return self.reciprocal_rank_fusion(doc_list)[:top_k]
 
     def rrf_invoke(self, queries: List[str], *args) -> List[DataEmbeddingDocumentDTO]:
-        doc_list = []
-        for query in queries:
-            docs = self._get_relevant_documents(query, *args)
-            doc_list.append(docs)
+        if settings.VECTOR_RRF_BATCHED:
+            doc_list = self._get_relevant_documents_batch(queries)
+        else:
+            doc_list = []
+            for query in queries:
+                docs = self._get_relevant_documents(query, *args)
+                doc_list.append(docs)
 
         top_k = self.search_kwargs.get("k", None)
 
@@ -654,7 +972,7 @@ class PGVectorRetriever:
             documents = await retriever.ainvoke(user_question)
 
         """
-        return await sync_to_async(self._get_relevant_documents)(query, *args)
+        return await self._aget_relevant_documents(query, *args)
 
     def _get_relevant_documents(
         self, query: str, *args
@@ -667,4 +985,51 @@ class PGVectorRetriever:
             return self.vectorstore.similarity_search_with_relevance_scores(
                 query, **self.search_kwargs
             )
-        raise ValueError(f"search_type of {self.search_type} not allowed.")
\ No newline at end of file
+        raise ValueError(f"search_type of {self.search_type} not allowed.")
+
+    async def _aget_relevant_documents(
+        self, query: str, *args
+    ) -> List[DataEmbeddingDocumentDTO]:
+        if self.search_type == "similarity":
+            return await self.vectorstore.asimilarity_search(
+                query, **self.search_kwargs
+            )
+        if self.search_type == "similarity_score_threshold":
+            return await self.vectorstore.asimilarity_search_with_relevance_scores(
+                query, **self.search_kwargs
+            )
+        raise ValueError(f"search_type of {self.search_type} not allowed.")
+
+    def _get_relevant_documents_batch(
+        self, queries: List[str]
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        """Results of every query from one embedding request and one KNN statement."""
+        if not queries:
+            return []
+        embeddings = self.vectorstore.embed_queries(queries)
+        doc_list = self.vectorstore.batch_similarity_search_by_vectors(
+            embeddings, k=self.search_kwargs.get("k", 4), filter=self.search_kwargs.get("filter")
+        )
+        return self._apply_batch_score_threshold(doc_list)
+
+    async def _aget_relevant_documents_batch(
+        self, queries: List[str]
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        if not queries:
+            return []
+        embeddings = await self.vectorstore.aembed_queries(queries)
+        doc_list = await self.vectorstore.abatch_similarity_search_by_vectors(
+            embeddings, k=self.search_kwargs.get("k", 4), filter=self.search_kwargs.get("filter")
+        )
+        return self._apply_batch_score_threshold(doc_list)
+
+    def _apply_batch_score_threshold(
+        self, doc_list: List[List[DataEmbeddingDocumentDTO]]
+    ) -> List[List[DataEmbeddingDocumentDTO]]:
+        if self.search_type != "similarity_score_threshold":
+            return doc_list
+        score_threshold = self.search_kwargs.get("score_threshold")
+        return [
+            self.vectorstore._apply_score_threshold(docs, score_threshold)
+            for docs in doc_list
+        ]
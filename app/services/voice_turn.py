@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Awaitable, Dict
+
+from fastapi import WebSocket
+
+from app.core import settings
+from app.dto.session import ResponseDTO
+from app.services.audio_service import AudioService
+from app.services.metrics import counter, histogram
+from app.services.tracing import span
+from app.services.tts_pipeline import StreamingTTSPipeline
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+voice_turns = counter("voice_turns_total", "Audio turns answered")
+voice_turn_stage_seconds = histogram(
+    "voice_turn_stage_seconds",
+    "Seconds from the start of an audio turn to each stage (transcribed, routed, first_token, text_sent, first_audio, done)",
+)
+
+
+class TurnTimer:
+    """Time from the start of a turn to the first time each stage is reached."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.start = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter() - self.start
+
+    def finish(self):
+        self.mark("done")
+        voice_turns.inc()
+        for stage, seconds in self.marks.items():
+            voice_turn_stage_seconds.observe(seconds, stage=stage)
+        logger.info("Voice turn", session_id=self.session_id,
+                    **{f"{stage}_ms": round(seconds * 1000) for stage, seconds in self.marks.items()})
+
+
+class AudioTurnPipeline:
+    """
+    Answers a turn with speech while overlapping its stages.
+
+    The TTS provider connection is opened while the reply is being generated.
+    The text frame goes out before the audio when the reply is known up front,
+    or as soon as the streamed text is complete, while the remaining sentences
+    are still being synthesized.
+    """
+
+    def __init__(self, audio_service: AudioService, tts_pipeline: StreamingTTSPipeline):
+        self.audio_service = audio_service
+        self.tts_pipeline = tts_pipeline
+
+    async def run(self, websocket: WebSocket, ask: Awaitable[ResponseDTO], timer: TurnTimer) -> ResponseDTO:
+        warmup = asyncio.create_task(self.audio_service.warmup()) if settings.TTS_WARMUP_ENABLED else None
+        try:
+            response = await ask
+            timer.mark("routed")
+            await self._send(websocket, response, timer)
+            return response
+        finally:
+            if warmup and not warmup.done():
+                warmup.cancel()
+            timer.finish()
+
+    async def _send(self, websocket: WebSocket, response: ResponseDTO, timer: TurnTimer):
+        # Text and audio frames are sent from different tasks
+        send_lock = asyncio.Lock()
+
+        async def send_text():
+            async with send_lock:
+                with span("ws.send", frame="text"):
+                    await websocket.send_text(json.dumps({"response": response.response,
+                                                          "artifact_url": response.artifact_url,
+                                                          "artifact_type": response.artifact_type}))
+            timer.mark("text_sent")
+
+        async def send_audio(audio: bytes):
+            async with send_lock:
+                with span("ws.send", frame="audio", audio_bytes=len(audio)):
+                    await websocket.send_bytes(audio)
+            timer.mark("first_audio")
+
+        if response.stream is None:
+            await send_text()
+            await self.tts_pipeline.run(self._single(response.response), send_audio)
+        else:
+            await self.tts_pipeline.run(self._streamed(response.stream, timer, send_text), send_audio)
+
+    @staticmethod
+    async def _single(text: str) -> AsyncIterator[str]:
+        yield text
+
+    @staticmethod
+    async def _streamed(stream: AsyncIterator[str], timer: TurnTimer, on_complete) -> AsyncIterator[str]:
+        async for delta in stream:
+            timer.mark("first_token")
+            yield delta
+        # response.response is filled in once the stream is consumed
+        await on_complete()